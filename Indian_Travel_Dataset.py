@@ -1,5 +1,7 @@
+import sys
 import pandas as pd
 import numpy as np
+from catalog_io import write_catalog
 
 # Create a comprehensive dataset of Indian travel destinations
 destinations_data = {
@@ -138,7 +140,8 @@ df = df.merge(budget_df, on='Destination_Name')
 # Display the first few rows of the dataset
 print(df.head())
 
-# Save to CSV
-df.to_csv('indian_destinations.csv', index=False)
+# Save the catalog (CSV by default; pass a .parquet or .arrow path for a columnar file)
+output_path = sys.argv[1] if len(sys.argv) > 1 else 'indian_destinations.csv'
+write_catalog(df, output_path)
 
 print(f"Dataset created with {len(df)} destinations")
\ No newline at end of file
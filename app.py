@@ -1,7 +1,36 @@
-import pandas as pd
-import numpy as np
+import os
 import streamlit as st
 from recommendation_system import IndianTravelRecommender
+from result_cache import CachedRecommender
+
+DATA_PATH = 'expanded_indian_destinations.csv'
+
+# Explore tab sort options and the browse_destinations order each one uses
+EXPLORE_SORT_ORDERS = {
+    "Popularity": 'popularity',
+    "Name": 'name',
+    "Budget (Low to High)": 'budget_low',
+    "Budget (High to Low)": 'budget_high'
+}
+
+EXPLORE_PAGE_SIZE = 12
+
+@st.cache_resource(max_entries=1, show_spinner="Loading destinations...")
+def load_recommender(data_path, data_version):
+    """
+    Build the recommender once per process and share it between all sessions
+    
+    The recommender is read-only after loading, so every session and rerun can
+    use the same instance. data_version is part of the cache key only, so a
+    changed data file builds a fresh recommender and evicts the old one. Hybrid
+    results are cached too, since many sessions ask the same questions.
+    """
+    return CachedRecommender(IndianTravelRecommender(data_path), max_entries=1024, ttl=3600)
+
+def get_recommender(data_path=DATA_PATH):
+    """Return the shared recommender, rebuilding it if the data file has changed"""
+    stat = os.stat(data_path)
+    return load_recommender(data_path, (stat.st_mtime_ns, stat.st_size))
 
 def main():
     """Main function to run the Streamlit app"""
@@ -13,9 +42,9 @@ def main():
     This hybrid recommendation system combines content-based, demographic, and popularity-based filtering.
     """)
     
-    # Initialize the recommender
+    # Get the shared recommender
     try:
-        recommender = IndianTravelRecommender('expanded_indian_destinations.csv')
+        recommender = get_recommender()
         
     except Exception as e:
         st.error(f"Error initializing the recommender: {e}")
@@ -105,6 +134,11 @@ def main():
                         col3.metric("Type", top_rec['Type'])
                         col4.metric("Popularity", f"{top_rec['Popularity_Score']}/10")
                         
+                        # Explain every recommendation in one pass, including its score breakdown
+                        explanations = recommender.explain_recommendations(
+                            recommendations['Destination_Name'], recommendations
+                        )
+                        
                         # Create expandable sections for each recommendation
                         for i, (_, rec) in enumerate(recommendations.iterrows()):
                             with st.expander(f"{i+1}. {rec['Destination_Name']} ({rec['State']})"):
@@ -135,8 +169,7 @@ def main():
                                 
                                 # Add detailed explanation
                                 st.markdown("### Why this destination?")
-                                explanation = recommender.explain_recommendation(rec['Destination_Name'])
-                                st.text(explanation)
+                                st.text(explanations[rec['Destination_Name']])
                     else:
                         st.warning("No recommendations found that match your criteria. Try adjusting your preferences.")
         else:
@@ -170,60 +203,76 @@ def main():
     with tab2:
         st.subheader("Explore All Destinations")
         
-        # Get all destinations data
-        all_destinations = pd.read_csv('expanded_indian_destinations.csv')
-        
-        # Filters
+        # Filters, with how many destinations each value would match given the
+        # other filters shown below them (the option labels stay fixed, since
+        # Streamlit re-creates a widget whose labels change and drops its selection)
+        selected_types = st.session_state.get('explore_types', [])
+        selected_states = st.session_state.get('explore_states', [])
+        matching, facet_counts = recommender.facet_search({'Type': selected_types, 'State': selected_states})
         col1, col2, col3 = st.columns(3)
         with col1:
             destination_type = st.multiselect(
                 "Filter by type:",
-                options=all_destinations['Type'].unique(),
-                default=[]
+                options=list(facet_counts['Type']) + [value for value in selected_types
+                                                      if value not in facet_counts['Type']],
+                key='explore_types'
             )
+            st.caption(", ".join(f"{value} ({count})" for value, count in facet_counts['Type'].items() if count))
         
         with col2:
             state_filter = st.multiselect(
                 "Filter by state:",
-                options=all_destinations['State'].unique(),
-                default=[]
+                options=list(facet_counts['State']) + [value for value in selected_states
+                                                       if value not in facet_counts['State']],
+                key='explore_states'
             )
+            st.caption(", ".join(f"{value} ({count})" for value, count in facet_counts['State'].items() if count))
             
         with col3:
             sort_by = st.selectbox(
                 "Sort by:",
-                options=["Popularity", "Name", "Budget (Low to High)", "Budget (High to Low)"],
+                options=list(EXPLORE_SORT_ORDERS),
                 index=0
             )
             
-        # Apply filters
-        filtered_df = all_destinations
+        # Start from the first page whenever the filters or the sort order change
+        explore_query = (tuple(destination_type), tuple(state_filter), sort_by)
+        if st.session_state.get('explore_query') != explore_query:
+            st.session_state['explore_query'] = explore_query
+            st.session_state['explore_cursors'] = [None]
+        cursors = st.session_state['explore_cursors']
         
-        if destination_type:
-            filtered_df = filtered_df[filtered_df['Type'].isin(destination_type)]
-            
-        if state_filter:
-            filtered_df = filtered_df[filtered_df['State'].isin(state_filter)]
-            
-        # Apply sorting
-        if sort_by == "Popularity":
-            filtered_df = filtered_df.sort_values('Popularity_Score', ascending=False)
-        elif sort_by == "Name":
-            filtered_df = filtered_df.sort_values('Destination_Name')
-        elif sort_by == "Budget (Low to High)":
-            filtered_df = filtered_df.sort_values('Budget_Min')
-        elif sort_by == "Budget (High to Low)":
-            filtered_df = filtered_df.sort_values('Budget_Min', ascending=False)
+        # Fetch only the current page
+        try:
+            page, next_cursor = recommender.browse_destinations(
+                EXPLORE_SORT_ORDERS[sort_by], destination_type, state_filter,
+                page_size=EXPLORE_PAGE_SIZE, cursor=cursors[-1]
+            )
+        except ValueError:
+            # The catalog changed since the page was opened
+            cursors[:] = [None]
+            page, next_cursor = recommender.browse_destinations(
+                EXPLORE_SORT_ORDERS[sort_by], destination_type, state_filter, page_size=EXPLORE_PAGE_SIZE
+            )
             
-        # Display filtered destinations
-        st.write(f"Showing {len(filtered_df)} destinations")
+        # Page navigation
+        first_shown = (len(cursors) - 1) * EXPLORE_PAGE_SIZE + 1
+        st.write(f"Showing destinations {first_shown}-{first_shown + len(page) - 1} of {len(matching)}" if len(page)
+                 else "No destinations match these filters")
+        col1, col2 = st.columns(2)
+        if col1.button("⬅️ Previous page", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+        if col2.button("Next page ➡️", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
         
         # Display as grid
-        for i in range(0, len(filtered_df), 3):
+        for i in range(0, len(page), 3):
             cols = st.columns(3)
             for j in range(3):
-                if i+j < len(filtered_df):
-                    dest = filtered_df.iloc[i+j]
+                if i+j < len(page):
+                    dest = page.iloc[i+j]
                     with cols[j]:
                         st.markdown(f"### {dest['Destination_Name']}")
                         st.markdown(f"**State:** {dest['State']}")
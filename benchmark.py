@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from recommendation_system import IndianTravelRecommender, MONTHS
+from sharded_scoring import ShardedRecommender
+from synthetic_catalog import generate_catalog
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+GROUP_TYPES = ['Family', 'Solo', 'Couple', 'Senior', 'Friends']
+
+def _git_commit():
+    """Current git commit of the working tree, or None outside a repository"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def sample_queries(recommender, num_queries, seed):
+    """Random hybrid queries over the recommender's vocabulary"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(num_queries):
+        num_preferences = int(rng.integers(1, 5))
+        queries.append({
+            'preferences': list(rng.choice(recommender.unique_preferences, size=num_preferences, replace=False)),
+            'group_type': str(rng.choice(GROUP_TYPES)),
+            'num_adults': int(rng.integers(1, 5)),
+            'num_children': int(rng.choice([0, 0, 1, 2, 4])),
+            'min_budget': int(rng.choice([500, 1000, 2000])),
+            'max_budget': int(rng.choice([5000, 10000, 20000])),
+            'current_month': str(rng.choice(MONTHS)),
+            'top_n': int(rng.integers(3, 11))
+        })
+    return queries
+
+def time_calls(function, arguments):
+    """Call function once per argument dict and return the per-call durations in seconds"""
+    durations = []
+    for kwargs in arguments:
+        started = time.perf_counter()
+        function(**kwargs)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+def summarize(durations):
+    """Latency statistics in milliseconds"""
+    milliseconds = np.asarray(durations) * 1000
+    return {
+        'calls': len(milliseconds),
+        'mean_ms': float(milliseconds.mean()),
+        'p50_ms': float(np.percentile(milliseconds, 50)),
+        'p95_ms': float(np.percentile(milliseconds, 95)),
+        'max_ms': float(milliseconds.max())
+    }
+
+def benchmark_size(num_destinations, num_queries=50, seed=0, shards=0):
+    """
+    Benchmark one catalog size
+
+    Args:
+        shards: Also time ShardedRecommender with this many worker processes (skipped when 0)
+
+    Returns:
+        List of result records, one per measured operation
+    """
+    catalog = generate_catalog(num_destinations, seed=seed)
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, 'catalog.csv')
+        catalog.to_csv(data_path, index=False)
+        del catalog
+
+        started = time.perf_counter()
+        recommender = IndianTravelRecommender(data_path, use_compiled=False)
+        startup_seconds = time.perf_counter() - started
+        return _benchmark_recommender(recommender, data_path, num_destinations, num_queries, seed, shards,
+                                      startup_seconds)
+
+def _benchmark_recommender(recommender, data_path, num_destinations, num_queries, seed, shards, startup_seconds):
+    """Time every operation of a loaded recommender"""
+    records = [{
+        'operation': 'startup',
+        **summarize([startup_seconds]),
+        'stages_ms': {stage: seconds * 1000 for stage, seconds in recommender.startup_timings.items()},
+        'catalog_bytes': sum(recommender.memory_usage().values()),
+        'memory_bytes': recommender.memory_usage(),
+        'peak_rss_bytes': _peak_rss_bytes()
+    }]
+
+    queries = sample_queries(recommender, num_queries, seed)
+    names = recommender.df['Destination_Name'].sample(num_queries, replace=True, random_state=seed).tolist()
+    operations = {
+        'get_recommendation_by_preferences': (recommender.get_recommendation_by_preferences,
+                                              [{'preferences': q['preferences'], 'top_n': q['top_n']} for q in queries]),
+        'get_recommendation_by_demographics': (recommender.get_recommendation_by_demographics,
+                                               [{key: q[key] for key in ('group_type', 'num_adults', 'num_children', 'top_n')}
+                                                for q in queries]),
+        'get_recommendation_by_budget': (recommender.get_recommendation_by_budget,
+                                         [{key: q[key] for key in ('min_budget', 'max_budget', 'top_n')} for q in queries]),
+        'get_hybrid_recommendations': (recommender.get_hybrid_recommendations, queries),
+        'explain_recommendation': (recommender.explain_recommendation, [{'destination_name': name} for name in names])
+    }
+    for operation, (function, arguments) in operations.items():
+        records.append({'operation': operation, **summarize(time_calls(function, arguments))})
+    
+    # The same hybrid queries with the threshold-algorithm top-k (the first
+    # calls include sorting its score lists)
+    recommender.topk_mode = 'threshold'
+    try:
+        records.append({'operation': 'get_hybrid_recommendations_threshold',
+                        **summarize(time_calls(recommender.get_hybrid_recommendations, queries))})
+    finally:
+        recommender.topk_mode = 'scan'
+
+    # The batch API is timed as one call and reported per profile
+    started = time.perf_counter()
+    recommender.get_hybrid_recommendations_batch(pd.DataFrame(queries))
+    batch_seconds = time.perf_counter() - started
+    records.append({'operation': 'get_hybrid_recommendations_batch', 'profiles': len(queries),
+                    **summarize([batch_seconds / len(queries)])})
+
+    if shards:
+        with ShardedRecommender(data_path, num_shards=shards) as sharded:
+            records.append({'operation': 'get_hybrid_recommendations_sharded', 'shards': shards,
+                            **summarize(time_calls(sharded.get_hybrid_recommendations, queries))})
+
+    for record in records:
+        record['destinations'] = num_destinations
+    return records
+
+def run(sizes, num_queries, seed, output, shards=0):
+    """Run the benchmark for every size and append the records to output as JSON lines"""
+    run_info = {
+        'run_started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'seed': seed
+    }
+    with open(output, 'a', encoding='utf-8') as results:
+        for size in sizes:
+            for record in benchmark_size(size, num_queries, seed, shards):
+                results.write(json.dumps({**run_info, **record}) + '\n')
+                print(f"{size:>9} {record['operation']:<36} mean {record['mean_ms']:10.3f} ms"
+                      f"  p95 {record['p95_ms']:10.3f} ms")
+
+def compare(baseline_path, candidate_path):
+    """Print the mean latency ratio of two result files per size and operation (the last run in each)"""
+    def latest(path):
+        records = pd.read_json(path, lines=True)
+        records = records[records['run_started'] == records['run_started'].max()]
+        return records.set_index(['destinations', 'operation'])['mean_ms']
+    baseline, candidate = latest(baseline_path), latest(candidate_path)
+    table = pd.DataFrame({'baseline_ms': baseline, 'candidate_ms': candidate}).dropna()
+    table['speedup'] = table['baseline_ms'] / table['candidate_ms']
+    print(table.to_string(float_format=lambda value: f"{value:.3f}"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark IndianTravelRecommender on synthetic catalogs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="catalog sizes to benchmark (default: 1K 10K 100K 1M)")
+    parser.add_argument('--queries', type=int, default=50, help="queries per operation (default: 50)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument('--output', default='benchmark_results.jsonl',
+                        help="JSON lines file the results are appended to (default: benchmark_results.jsonl)")
+    parser.add_argument('--shards', type=int, default=0,
+                        help="also time sharded hybrid scoring with this many worker processes")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="compare the latest runs of two result files instead of benchmarking")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args.sizes, args.queries, args.seed, args.output, args.shards)
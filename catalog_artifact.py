@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+
+# Bump whenever the set or layout of the compiled arrays changes, so stale
+# artifacts are recompiled instead of loaded
+ARTIFACT_VERSION = 5
+
+MANIFEST_NAME = 'manifest.json'
+
+def source_hash(data_path):
+    """SHA-256 hex digest of a catalog source file"""
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def default_cache_dir(data_path):
+    """Directory holding the compiled artifacts of a catalog source file"""
+    return os.path.join(os.path.dirname(os.path.abspath(data_path)), '.catalog_cache')
+
+def artifact_path(data_path, cache_dir=None, digest=None):
+    """
+    Location of the compiled artifact for a catalog source file
+
+    The directory name contains the source hash and the artifact version, so an
+    edited catalog or a new artifact layout maps to a fresh artifact and old
+    workers can keep reading the version they loaded.
+    """
+    if digest is None:
+        digest = source_hash(data_path)
+    stem = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(cache_dir or default_cache_dir(data_path), f"{stem}-{digest[:16]}-v{ARTIFACT_VERSION}")
+
+def find_artifact(data_path, cache_dir=None):
+    """Path of an up-to-date compiled artifact for data_path, or None if there is none"""
+    digest = source_hash(data_path)
+    path = artifact_path(data_path, cache_dir, digest)
+    try:
+        manifest = read_manifest(path)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != ARTIFACT_VERSION or manifest.get('source_sha256') != digest:
+        return None
+    return path
+
+def read_manifest(path):
+    """Read the manifest of a compiled artifact"""
+    with open(os.path.join(path, MANIFEST_NAME), encoding='utf-8') as manifest_file:
+        return json.load(manifest_file)
+
+def write_artifact(path, manifest, arrays):
+    """
+    Write a compiled artifact: a manifest plus one .npy file per array
+
+    The artifact is written to a temporary directory next to path and renamed
+    into place, so concurrent readers never see a partial artifact.
+
+    Args:
+        path: Artifact directory to create
+        manifest: JSON-serializable metadata
+        arrays: Dict of array name to numpy array (no object arrays)
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=parent)
+    try:
+        os.chmod(staging, 0o755)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+        manifest = dict(manifest, version=ARTIFACT_VERSION, arrays=sorted(arrays))
+        with open(os.path.join(staging, MANIFEST_NAME), 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file)
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # Another process compiled the same artifact first; keep theirs
+            if not os.path.isdir(path):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return path
+
+def read_artifact(path):
+    """
+    Open a compiled artifact
+
+    Arrays are memory-mapped read-only, so processes loading the same artifact
+    share its pages through the operating system's page cache.
+
+    Returns:
+        Tuple (manifest, arrays) with arrays as a dict of name to memory-mapped array
+    """
+    manifest = read_manifest(path)
+    if manifest.get('version') != ARTIFACT_VERSION:
+        raise ValueError(f"Artifact {path} has version {manifest.get('version')}, expected {ARTIFACT_VERSION}")
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+              for name in manifest['arrays']}
+    return manifest, arrays
+
+def compile_catalog(data_path, cache_dir=None, force=False, data_format=None):
+    """
+    Compile a catalog source file into its binary artifact
+
+    Args:
+        data_path: Catalog file (CSV, Parquet or Arrow IPC)
+        cache_dir: Directory for compiled artifacts (next to data_path when None)
+        force: Recompile even if an up-to-date artifact exists
+        data_format: Format of data_path (from its extension when None)
+
+    Returns:
+        Path of the compiled artifact
+    """
+    from recommendation_system import IndianTravelRecommender
+
+    digest = source_hash(data_path)
+    path = artifact_path(data_path, cache_dir, digest)
+    if not force and find_artifact(data_path, cache_dir) == path:
+        return path
+    if force and os.path.isdir(path):
+        shutil.rmtree(path)
+
+    recommender = IndianTravelRecommender(data_path, use_compiled=False, data_format=data_format)
+    manifest, arrays = recommender.compiled_catalog()
+    manifest['source_sha256'] = digest
+    manifest['source_name'] = os.path.basename(data_path)
+    return write_artifact(path, manifest, arrays)
+
+
+if __name__ == "__main__":
+    # Compile the catalogs given on the command line (the expanded catalog by default)
+    for data_path in sys.argv[1:] or ['expanded_indian_destinations.csv']:
+        print(f"{data_path} -> {compile_catalog(data_path, force=True)}")
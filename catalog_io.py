@@ -0,0 +1,116 @@
+import os
+import pandas as pd
+
+# Columns of a catalog source file; columnar formats read only these
+CATALOG_COLUMNS = ['Destination_Name', 'State', 'Type', 'Best_Time_to_Visit', 'Preferences',
+                   'Family_Friendly', 'Solo_Travel', 'Couple_Friendly', 'Senior_Friendly',
+                   'Budget_Traveler', 'Luxury_Traveler', 'Popularity_Score', 'Budget_Min', 'Budget_Max']
+
+# Month names in calendar order, as Best_Time_to_Visit ranges spell them
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+# Low-cardinality text columns, stored dictionary-encoded in Parquet and Arrow files
+DICTIONARY_COLUMNS = ['State', 'Type', 'Best_Time_to_Visit']
+
+# Catalog file formats by file extension
+CATALOG_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow'
+}
+
+def catalog_format(data_path, data_format=None):
+    """
+    Format of a catalog file: data_format when given, otherwise the one its extension names
+
+    Returns:
+        'csv', 'parquet' or 'arrow'
+    """
+    if data_format is None:
+        extension = os.path.splitext(data_path)[1].lower()
+        data_format = CATALOG_FORMATS.get(extension)
+        if data_format is None:
+            raise ValueError(f"Cannot tell the format of {data_path}; pass data_format "
+                             f"({', '.join(sorted(set(CATALOG_FORMATS.values())))})")
+    elif data_format not in CATALOG_FORMATS.values():
+        raise ValueError(f"Unknown catalog format {data_format!r}")
+    return data_format
+
+def read_catalog(data_path, data_format=None, columns=CATALOG_COLUMNS, dictionary_columns=DICTIONARY_COLUMNS):
+    """
+    Read a catalog file into a DataFrame
+
+    CSV files are parsed whole. Parquet and Arrow IPC files are memory-mapped
+    and only the listed columns are read; dictionary_columns stay
+    dictionary-encoded and become pandas categoricals with sorted categories,
+    and the other columns are converted without copying where Arrow allows it.
+
+    Args:
+        data_path: Catalog file
+        data_format: 'csv', 'parquet' or 'arrow' (from the file extension when None)
+        columns: Columns to read from Parquet and Arrow files (those the file lacks are skipped)
+        dictionary_columns: Text columns to read dictionary-encoded
+
+    Returns:
+        Catalog DataFrame
+    """
+    data_format = catalog_format(data_path, data_format)
+    if data_format == 'csv':
+        return pd.read_csv(data_path)
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    if data_format == 'parquet':
+        import pyarrow.parquet as pq
+        present = set(pq.read_schema(data_path, memory_map=True).names)
+        table = pq.read_table(data_path, columns=[column for column in columns if column in present],
+                              memory_map=True, read_dictionary=[column for column in dictionary_columns
+                                                                if column in present])
+    else:
+        source = pa.memory_map(data_path)
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+        table = table.select([column for column in columns if column in table.column_names])
+
+    for column in dictionary_columns:
+        if column in table.column_names and not pa.types.is_dictionary(table.schema.field(column).type):
+            index = table.column_names.index(column)
+            table = table.set_column(index, column, pc.dictionary_encode(table[column]))
+    df = table.to_pandas(split_blocks=True)
+    # Sorted categories, as a CSV catalog gets them, so both give the same codes
+    for column in dictionary_columns:
+        if column in df and not df[column].cat.categories.is_monotonic_increasing:
+            df[column] = df[column].cat.reorder_categories(df[column].cat.categories.sort_values())
+    return df
+
+def write_catalog(df, data_path, data_format=None, dictionary_columns=DICTIONARY_COLUMNS):
+    """
+    Write a catalog DataFrame as CSV, Parquet or Arrow IPC
+
+    Args:
+        df: Catalog DataFrame
+        data_path: File to write
+        data_format: 'csv', 'parquet' or 'arrow' (from the file extension when None)
+        dictionary_columns: Text columns to store dictionary-encoded (Parquet and Arrow only)
+    """
+    data_format = catalog_format(data_path, data_format)
+    if data_format == 'csv':
+        df.to_csv(data_path, index=False)
+        return
+
+    import pyarrow as pa
+    df = df.astype({column: 'category' for column in dictionary_columns if column in df})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if data_format == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, data_path)
+    else:
+        with pa.OSFile(data_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
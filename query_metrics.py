@@ -0,0 +1,177 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Upper bounds (in seconds) of the stage latency histogram buckets
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+class QueryTrace:
+    """
+    Stage timings of a single query
+
+    Each call to mark closes a stage: it records the wall time since the
+    previous mark (or since the trace started) and the number of destination
+    rows the stage touched. finish hands the stages to the sink.
+    """
+    __slots__ = ('sink', 'query', 'stages', 'last')
+
+    def __init__(self, sink, query):
+        self.sink = sink
+        self.query = query
+        self.stages = []
+        self.last = time.perf_counter()
+
+    def mark(self, stage, rows):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last, int(rows)))
+        self.last = now
+
+    def finish(self):
+        self.sink.record(self.query, self.stages)
+
+class _NullTrace:
+    """Trace used when instrumentation is disabled; every call is a no-op"""
+    __slots__ = ()
+
+    def mark(self, stage, rows):
+        pass
+
+    def finish(self):
+        pass
+
+NULL_TRACE = _NullTrace()
+
+def start_trace(sink, query):
+    """Start a trace for a query, or return the no-op trace when sink is None"""
+    return NULL_TRACE if sink is None else QueryTrace(sink, query)
+
+class HistogramSink:
+    """
+    In-memory latency histograms per query and stage
+
+    Thread-safe, so one sink can collect the stages of every session sharing a
+    recommender.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, query, stages):
+        with self._lock:
+            for stage, seconds, rows in stages:
+                entry = self._stages.get((query, stage))
+                if entry is None:
+                    entry = self._stages[(query, stage)] = {
+                        'count': 0, 'seconds': 0.0, 'rows': 0, 'buckets': [0] * (len(self.buckets) + 1)
+                    }
+                entry['count'] += 1
+                entry['seconds'] += seconds
+                entry['rows'] += rows
+                entry['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def snapshot(self):
+        """
+        Copy of the collected histograms
+
+        Returns:
+            Dict of (query, stage) to a dict with count, seconds (total), rows
+            (total) and buckets (observations per bucket, the last one unbounded)
+        """
+        with self._lock:
+            return {key: dict(entry, buckets=list(entry['buckets'])) for key, entry in self._stages.items()}
+
+    def report(self):
+        """
+        Summarize the collected histograms
+
+        Returns:
+            String with one line per query stage: calls, mean time and mean rows touched
+        """
+        report = "Query stage timings:\n"
+        for (query, stage), entry in self.snapshot().items():
+            report += (f"- {query}.{stage}: {entry['count']} calls, "
+                       f"{entry['seconds'] / entry['count'] * 1000:.3f} ms mean, "
+                       f"{entry['rows'] / entry['count']:.0f} rows mean\n")
+        return report
+
+    def reset(self):
+        """Drop everything collected so far"""
+        with self._lock:
+            self._stages.clear()
+
+class JsonlSink:
+    """Append one JSON line per query, with the time and rows touched of each stage"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, query, stages):
+        line = json.dumps({
+            'timestamp': time.time(),
+            'query': query,
+            'total_ms': sum(seconds for _, seconds, _ in stages) * 1000,
+            'stages': [{'stage': stage, 'ms': seconds * 1000, 'rows': rows} for stage, seconds, rows in stages]
+        })
+        with self._lock, open(self.path, 'a', encoding='utf-8') as output:
+            output.write(line + '\n')
+
+class PrometheusSink(HistogramSink):
+    """
+    Histograms exported as a Prometheus text exposition file
+
+    The file is rewritten every flush_every queries (and on flush), through a
+    temporary file and a rename, so a node exporter textfile collector never
+    reads a partial file.
+    """
+    def __init__(self, path, flush_every=100, buckets=DEFAULT_BUCKETS):
+        super().__init__(buckets)
+        self.path = path
+        self.flush_every = flush_every
+        self._pending = 0
+
+    def record(self, query, stages):
+        super().record(query, stages)
+        with self._lock:
+            self._pending += 1
+            due = self._pending >= self.flush_every
+        if due:
+            self.flush()
+
+    def exposition(self):
+        """Current histograms in the Prometheus text format"""
+        lines = ["# HELP recommender_stage_seconds Wall time of each query stage.",
+                 "# TYPE recommender_stage_seconds histogram"]
+        snapshot = self.snapshot()
+        for (query, stage), entry in snapshot.items():
+            labels = f'query="{query}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry['buckets']):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'recommender_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"recommender_stage_seconds_sum{{{labels}}} {entry['seconds']!r}")
+            lines.append(f"recommender_stage_seconds_count{{{labels}}} {entry['count']}")
+        lines += ["# HELP recommender_stage_rows_total Destination rows touched by each query stage.",
+                  "# TYPE recommender_stage_rows_total counter"]
+        for (query, stage), entry in snapshot.items():
+            lines.append(f'recommender_stage_rows_total{{query="{query}",stage="{stage}"}} {entry["rows"]}')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """Write the exposition file now"""
+        with self._lock:
+            self._pending = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, staging = tempfile.mkstemp(prefix='.metrics-', dir=directory)
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as output:
+                output.write(self.exposition())
+            os.chmod(staging, 0o644)
+            os.replace(staging, self.path)
+        except BaseException:
+            os.unlink(staging)
+            raise
@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from recommendation_system import IndianTravelRecommender, BATCH_PROFILE_DEFAULTS
+
+MAX_BODY_BYTES = 1 << 20
+
+MAX_HEADER_LINES = 100
+
+# Arguments accepted by each query endpoint, mapped to the recommender method they call
+QUERY_ENDPOINTS = {
+    '/preferences': ('get_recommendation_by_preferences', {'preferences', 'top_n'}),
+    '/demographics': ('get_recommendation_by_demographics', {'group_type', 'num_adults', 'num_children', 'top_n'}),
+    '/budget': ('get_recommendation_by_budget', {'min_budget', 'max_budget', 'top_n'}),
+}
+
+class BadRequest(Exception):
+    """A request that cannot be served, answered with 400"""
+
+def _json_default(value):
+    """Convert numpy scalars (and anything else with item()) for json.dumps"""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _records(frame):
+    """DataFrame rows as JSON-ready dicts (infinite or missing numbers become null)"""
+    records = frame.to_dict('records')
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, float) and not math.isfinite(value):
+                record[key] = None
+    return records
+
+class HybridBatcher:
+    """
+    Group hybrid queries arriving close together into one batched scoring call
+
+    The first query of a batch starts a timer of window seconds; every query
+    arriving before it fires (up to max_batch) is scored with it through
+    get_hybrid_recommendations_batch in the executor, so the event loop never
+    runs the scoring itself.
+    """
+    def __init__(self, recommender, executor, window=0.002, max_batch=256):
+        self.recommender = recommender
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        # Scoring tasks in flight; the event loop only keeps weak references to tasks
+        self._tasks = set()
+
+    async def submit(self, profile):
+        """Score one profile and return its recommendations"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((profile, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._score(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, batch):
+        loop = asyncio.get_running_loop()
+        profiles = [profile for profile, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, self._score_profiles, profiles)
+        except Exception:
+            # Score each profile on its own, so only the one that fails gets the error
+            for profile, future in batch:
+                try:
+                    result, = await loop.run_in_executor(self.executor, self._score_profiles, [profile])
+                except Exception as error:
+                    if not future.done():
+                        future.set_exception(error)
+                    continue
+                if not future.done():
+                    future.set_result(result)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _score_profiles(self, profiles):
+        """Run the batched scoring and split the result per profile (executor thread)"""
+        # Rank and look the destinations up in one catalog version
+        snapshot = self.recommender.snapshot()
+        ranked = snapshot.get_hybrid_recommendations_batch(profiles)
+        destinations = snapshot.df.iloc[ranked['destination_index'].to_numpy()]
+        destinations = destinations.assign(Final_Score=ranked['score'].to_numpy())
+        results = [[] for _ in profiles]
+        for profile_id, record in zip(ranked['profile_id'], _records(destinations)):
+            results[profile_id].append(record)
+        return results
+
+class RecommendationServer:
+    """
+    Minimal HTTP/1.1 JSON server over one shared IndianTravelRecommender
+
+    Endpoints (POST with a JSON object body, except /health):
+    - /hybrid: get_hybrid_recommendations arguments, micro-batched
+    - /preferences, /demographics, /budget: the matching get_recommendation_by_* arguments
+    - /explain: {"name": ...} or {"names": [...]}
+    - GET /health: catalog size and batching settings
+    """
+    def __init__(self, recommender, workers=4, window=0.002, max_batch=256):
+        self.recommender = recommender
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scoring')
+        self.batcher = HybridBatcher(recommender, self.executor, window, max_batch)
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        """Listen on host:port until cancelled"""
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except BadRequest as error:
+            self._write_response(writer, HTTPStatus.BAD_REQUEST, {'error': str(error)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Read one request, or return None when the connection is closed"""
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split()
+        except ValueError:
+            raise BadRequest("Malformed request line")
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise BadRequest("Too many headers")
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise BadRequest("Invalid Content-Length")
+        if not 0 <= length <= MAX_BODY_BYTES:
+            raise BadRequest("Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target.split('?', 1)[0], headers, body
+
+    async def _dispatch(self, method, path, body):
+        """Route a request and return (status, JSON payload)"""
+        if path == '/health':
+            return HTTPStatus.OK, {
+                'status': 'ok',
+                'destinations': len(self.recommender.df),
+                'batch_window_ms': self.batcher.window * 1000,
+                'max_batch': self.batcher.max_batch
+            }
+        if path != '/hybrid' and path != '/explain' and path not in QUERY_ENDPOINTS:
+            return HTTPStatus.NOT_FOUND, {'error': f"Unknown endpoint {path}"}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"{path} only accepts POST"}
+
+        try:
+            arguments = json.loads(body or b'{}')
+            if not isinstance(arguments, dict):
+                raise BadRequest("The request body must be a JSON object")
+            if path == '/hybrid':
+                return HTTPStatus.OK, {'recommendations': await self._hybrid(arguments)}
+            if path == '/explain':
+                return HTTPStatus.OK, {'explanations': await self._explain(arguments)}
+            return HTTPStatus.OK, {'recommendations': await self._query(path, arguments)}
+        except (BadRequest, ValueError, TypeError) as error:
+            return HTTPStatus.BAD_REQUEST, {'error': str(error)}
+        except Exception as error:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(error).__name__}: {error}"}
+
+    async def _hybrid(self, arguments):
+        unknown = set(arguments) - set(BATCH_PROFILE_DEFAULTS) - {'preferences'}
+        if unknown:
+            raise BadRequest(f"Unknown arguments: {', '.join(sorted(unknown))}")
+        if 'preferences' not in arguments:
+            raise BadRequest("Missing argument: preferences")
+        profile = dict(BATCH_PROFILE_DEFAULTS, **arguments)
+        preferences = profile['preferences']
+        if not (isinstance(preferences, str) or
+                isinstance(preferences, list) and all(isinstance(keyword, str) for keyword in preferences)):
+            raise BadRequest("preferences must be a string or a list of strings")
+        if not isinstance(profile['group_type'], str):
+            raise BadRequest("group_type must be a string")
+        month = profile['current_month']
+        if not (month is None or isinstance(month, str) or
+                isinstance(month, list) and all(isinstance(name, str) for name in month)):
+            raise BadRequest("current_month must be a string, a list of strings or null")
+        if profile['max_budget'] is None:
+            profile['max_budget'] = float('inf')
+        for name in ('num_adults', 'num_children', 'top_n'):
+            profile[name] = int(profile[name])
+        for name in ('min_budget', 'max_budget'):
+            profile[name] = float(profile[name])
+        return await self.batcher.submit(profile)
+
+    async def _query(self, path, arguments):
+        method, accepted = QUERY_ENDPOINTS[path]
+        unknown = set(arguments) - accepted
+        if unknown:
+            raise BadRequest(f"Unknown arguments: {', '.join(sorted(unknown))}")
+        if arguments.get('max_budget', 0) is None:
+            arguments['max_budget'] = float('inf')
+        query = getattr(self.recommender, method)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: _records(query(**arguments)))
+
+    async def _explain(self, arguments):
+        names = arguments.get('names', [arguments['name']] if 'name' in arguments else None)
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise BadRequest("Pass a destination name as 'name' or a list of names as 'names'")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.recommender.explain_recommendations, names)
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=_json_default).encode('utf-8')
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve travel recommendations as JSON over HTTP")
+    parser.add_argument('--data', default='expanded_indian_destinations.csv',
+                        help="catalog CSV or compiled artifact directory")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument('--workers', type=int, default=4, help="scoring threads (default: 4)")
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                        help="how long a hybrid query waits for others to batch with (default: 2)")
+    parser.add_argument('--max-batch', type=int, default=256, help="largest hybrid batch (default: 256)")
+    args = parser.parse_args()
+
+    server = RecommendationServer(IndianTravelRecommender(args.data), args.workers,
+                                  args.batch_window_ms / 1000, args.max_batch)
+    print(f"Serving recommendations on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -1,37 +1,1421 @@
+import base64
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics.pairwise import cosine_similarity
+from catalog_artifact import find_artifact, read_artifact
+from catalog_io import DICTIONARY_COLUMNS, MONTHS, catalog_format, read_catalog
+from query_metrics import NULL_TRACE, start_trace
+
+# Catalog column holding the demographic rating for each travel group type
+DEMOGRAPHIC_COLUMNS = {
+    'Family': 'Family_Friendly',
+    'Solo': 'Solo_Travel',
+    'Couple': 'Couple_Friendly',
+    'Senior': 'Senior_Friendly'
+}
+
+# Bit i of a month mask stands for MONTHS[i]
+ALL_MONTHS_MASK = (1 << len(MONTHS)) - 1
+
+# Best_Time_to_Visit values meaning the destination is in season all year
+YEAR_ROUND = {'year-round', 'year round', 'all year', 'throughout the year'}
+
+# Destination types boosted and penalized for groups with more than three children
+FAMILY_BOOST_TYPES = ['Beach', 'Theme Park', 'Wildlife']
+ADVENTURE_PENALTY_TYPES = ['Adventure', 'Trekking', 'Mountains']
+
+# Operators of adjustment rule conditions and row predicates (see AdjustmentRule)
+RULE_OPERATORS = {
+    'in': np.isin,
+    'not in': lambda values, choices: ~np.isin(values, choices),
+    '==': np.equal,
+    '!=': np.not_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal
+}
+
+# Defaults for the profile columns of get_hybrid_recommendations_batch
+BATCH_PROFILE_DEFAULTS = {
+    'group_type': 'Family',
+    'num_adults': 1,
+    'num_children': 0,
+    'min_budget': 0,
+    'max_budget': float('inf'),
+    'current_month': None,
+    'top_n': 5
+}
+
+# Numeric catalog columns kept as read-only arrays for scoring
+NUMERIC_COLUMNS = ['Family_Friendly', 'Solo_Travel', 'Couple_Friendly', 'Senior_Friendly',
+                   'Popularity_Score', 'Budget_Min', 'Budget_Max']
+
+# Compact storage for the catalog: low-cardinality text columns become
+# categoricals and integer columns the narrowest type holding their values
+CATEGORY_COLUMNS = DICTIONARY_COLUMNS
+COMPACT_DTYPES = {
+    'Family_Friendly': np.int8,
+    'Solo_Travel': np.int8,
+    'Couple_Friendly': np.int8,
+    'Senior_Friendly': np.int8,
+    'Budget_Traveler': np.int8,
+    'Luxury_Traveler': np.int8,
+    'Popularity_Score': np.int8,
+    'Budget_Min': np.int32,
+    'Budget_Max': np.int32
+}
+
+# Catalog columns shown in destination explanations
+EXPLANATION_COLUMNS = ['State', 'Type', 'Best_Time_to_Visit', 'Popularity_Score', 'Budget_Min', 'Budget_Max',
+                       'Preferences', 'Family_Friendly', 'Solo_Travel', 'Couple_Friendly', 'Senior_Friendly']
+
+# Score columns of recommendation results and their labels in explanations
+SCORE_LABELS = {
+    'Preference_Similarity': 'Preference match',
+    'Demo_Score': 'Group suitability',
+    'Budget_Fit': 'Budget fit',
+    'Season_Match': 'Season match',
+    'Final_Score': 'Final score'
+}
+
+# Upper bound on profiles x destinations scored together in one batch chunk
+BATCH_CHUNK_CELLS = 2 ** 21
+
+# Orderings offered by browse_destinations: sort key -> (column, ascending)
+BROWSE_ORDERS = {
+    'popularity': ('Popularity_Score', False),
+    'name': ('Destination_Name', True),
+    'budget_low': ('Budget_Min', True),
+    'budget_high': ('Budget_Min', False)
+}
+
+# Facets of filtered browsing (see FacetIndex), in the order their counts are reported
+FACETS = ['Type', 'State', 'Season', 'Budget', 'Suited_For']
+
+# Bands of the Budget facet: label and the Budget_Min below which a destination falls in it
+BUDGET_BANDS = [('Under 1000', 1000), ('1000-1499', 1500), ('1500-1999', 2000), ('2000 and above', float('inf'))]
+
+# Lowest demographic rating for which a destination counts as suited to a group type
+SUITABLE_RATING = 4
+
+# Default bound on the memory of memoized partial score vectors (see PartialScoreCache)
+PARTIAL_SCORE_CACHE_BYTES = 2 ** 27
+
+# Ways get_hybrid_recommendations can find its top_n: 'scan' scores every destination
+# in the budget, 'threshold' walks presorted score lists and stops early (same results)
+TOPK_MODES = ['scan', 'threshold']
+
+# Source of catalog version tokens; every prepared or loaded catalog gets a new one
+_catalog_versions = itertools.count(1)
+
+def on_snapshot(method):
+    """
+    Run a recommender method against the catalog version current when it is called
+    
+    Catalog updates swap a new version in while queries may be running, so a
+    query pins the version it started with and never mixes arrays of two versions.
+    """
+    @functools.wraps(method)
+    def pinned(self, *args, **kwargs):
+        return method(self.snapshot(), *args, **kwargs)
+    return pinned
+
+def top_rows(scores, top_n):
+    """
+    Positions of the top_n highest scores without sorting the whole array
+    
+    The top_n-th largest score is found with a linear-time partition, only the
+    scores at or above it are sorted, and ties are broken by position so the
+    ranking is stable.
+    
+    Args:
+        scores: 1-D array of scores
+        top_n: Number of positions to return
+        
+    Returns:
+        Array of positions, highest score first
+    """
+    top_n = min(max(int(top_n), 0), len(scores))
+    if top_n == 0:
+        return np.empty(0, dtype=np.intp)
+    if top_n < len(scores):
+        threshold = -np.partition(-scores, top_n - 1)[top_n - 1]
+        rows = np.flatnonzero(scores >= threshold)
+    else:
+        rows = np.arange(len(scores))
+    return rows[np.lexsort((rows, -scores[rows]))[:top_n]]
+
+
+def top_rows_2d(scores, top_n):
+    """
+    Row-wise top_rows for a 2-D array of scores (one row per query)
+    
+    Returns:
+        Array of shape (len(scores), min(top_n, scores.shape[1])) with the
+        positions of each row's highest scores, highest first
+    """
+    top_n = min(max(int(top_n), 0), scores.shape[1])
+    if top_n == 0:
+        return np.empty((len(scores), 0), dtype=np.intp)
+    selected = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    selected_scores = np.take_along_axis(scores, selected, axis=1)
+    
+    # argpartition picks arbitrarily among scores tied with the last selected
+    # one, so redo the rows where such ties exist with the stable 1-D selection
+    threshold = selected_scores.min(axis=1, keepdims=True)
+    for i in np.flatnonzero((scores >= threshold).sum(axis=1) > top_n):
+        selected[i] = top_rows(scores[i], top_n)
+        selected_scores[i] = scores[i, selected[i]]
+    order = np.lexsort((selected, -selected_scores), axis=1)
+    return np.take_along_axis(selected, order, axis=1)
+
+
+def month_mask(months):
+    """
+    Compile months into a 12-bit mask (bit 0 is January)
+    
+    Args:
+        months: A month name ('October'), a range of months ('October-March',
+            wrapping around the year end), a list of either, or None.
+            Month names may be abbreviated to their first three letters.
+            
+    Returns:
+        Integer mask with one bit set per month covered (0 for None or
+        anything that cannot be parsed)
+    """
+    if isinstance(months, str):
+        text = months.strip().lower()
+        if text in YEAR_ROUND:
+            return ALL_MONTHS_MASK
+        bounds = [_month_number(part) for part in text.split('-')]
+        if len(bounds) > 2 or None in bounds:
+            return 0
+        first, last = bounds[0], bounds[-1]
+        if first <= last:
+            covered = range(first, last + 1)
+        else:
+            covered = list(range(first, len(MONTHS))) + list(range(0, last + 1))
+        return sum(1 << month for month in covered)
+    if isinstance(months, (list, tuple, set, frozenset, np.ndarray)):
+        mask = 0
+        for month in months:
+            mask |= month_mask(month)
+        return mask
+    return 0
+
+
+def _month_number(name):
+    """Zero-based month number for a month name or its abbreviation, or None"""
+    name = name.strip().lower()
+    if len(name) >= 3:
+        for number, month in enumerate(MONTHS):
+            if month.lower().startswith(name):
+                return number
+    return None
+
+
+def compact_catalog(df):
+    """
+    Catalog DataFrame with the compact column dtypes
+    
+    Columns listed in COMPACT_DTYPES keep their dtype when a value does not fit
+    the compact one, so unusual catalogs load unchanged rather than overflowing.
+    """
+    columns = {}
+    for column in CATEGORY_COLUMNS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            columns[column] = df[column].astype('category')
+    for column, dtype in COMPACT_DTYPES.items():
+        if column in df and pd.api.types.is_integer_dtype(df[column].dtype) and df[column].dtype != dtype:
+            limits = np.iinfo(dtype)
+            if len(df) == 0 or (df[column].min() >= limits.min and df[column].max() <= limits.max):
+                columns[column] = df[column].astype(dtype)
+    return df.assign(**columns) if columns else df
+
+def encode_text(values):
+    """
+    Pack a text column into UTF-8 bytes and offsets
+    
+    Returns:
+        Tuple (offsets, data) with the int64 start offset of every value (plus
+        the end of the last one) and the uint8 concatenated bytes
+    """
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+def decode_text(offsets, data):
+    """
+    Text column packed by encode_text, with the dtype pandas reads text columns as
+    
+    With pyarrow the column wraps the buffers (memory-mapped ones stay shared)
+    instead of copying them into Python strings.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        text = bytes(data)
+        return pd.array([text[start:stop].decode('utf-8') for start, stop in zip(offsets[:-1], offsets[1:])],
+                        dtype='str')
+    strings = pa.LargeStringArray.from_buffers(len(offsets) - 1, pa.py_buffer(offsets), pa.py_buffer(data))
+    return pd.array(strings, dtype='str')
+
+def code_dtype(num_values):
+    """Narrowest signed integer type for codes into num_values values (and -1 for missing)"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if num_values <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def split_preferences(preferences):
+    """
+    Exact keywords of a column of comma-separated preference lists
+    
+    Returns:
+        Series of stripped, non-empty keywords indexed by the position of the
+        list they come from
+    """
+    keywords = pd.Series(np.asarray(preferences, dtype=object)).str.split(',').explode().str.strip()
+    return keywords[keywords.notna() & (keywords != '')]
+
+def preference_matrix(rows, columns, num_rows, num_columns):
+    """
+    Sparse binary destination x preference matrix and its row norms
+    
+    A keyword listed twice counts once, so cosine similarity against a query is
+    the exact overlap count divided by the product of the norms. The matrix is
+    only kept as its CSC postings (and packed bits, see preference_bits).
+    
+    Args:
+        rows: Destination position of every keyword occurrence
+        columns: Preference column of every keyword occurrence
+        
+    Returns:
+        Tuple (CSR matrix, array of row norms)
+    """
+    matrix = sparse.csr_matrix((np.ones(len(columns), dtype=np.int8), (rows, columns)), shape=(num_rows, num_columns))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix, np.sqrt(np.diff(matrix.indptr)).astype(float)
+
+def preference_bits(matrix):
+    """
+    Bit-packed binary destination x preference matrix
+    
+    Bit i of word j of a destination is set when it offers keyword 64 * j + i,
+    so its overlap with a query is the popcount of the AND of their words.
+    Words are stored word-major: a query only reads the (contiguous) words
+    holding its keywords.
+    
+    Args:
+        matrix: CSC preference matrix (the preference postings)
+        
+    Returns:
+        uint64 array with a row per 64 keywords and a column per destination
+    """
+    num_rows, num_columns = matrix.shape
+    bits = np.zeros((max(1, -(-num_columns // 64)), num_rows), dtype=np.uint64)
+    rows = matrix.indices
+    columns = np.repeat(np.arange(num_columns, dtype=np.uint64), np.diff(matrix.indptr))
+    np.bitwise_or.at(bits, (columns >> np.uint64(6), rows), np.uint64(1) << (columns & np.uint64(63)))
+    return bits
+
+def pack_bits(membership, num_words):
+    """
+    Pack boolean rows into bitmaps of 64-bit words
+    
+    Bit i of word j of a bitmap stands for column 64 * j + i of its row.
+    
+    Args:
+        membership: Boolean array, one bitmap per row (the last axis)
+        num_words: Number of words per bitmap (at least a bit per column)
+        
+    Returns:
+        uint64 array with the shape of membership, the last axis holding words
+    """
+    packed = np.packbits(membership, axis=-1, bitorder='little')
+    words = np.zeros(membership.shape[:-1] + (num_words * 8,), dtype=np.uint8)
+    words[..., :packed.shape[-1]] = packed
+    return words.view('<u8')
+
+def bitmap_contains(bitmap, positions):
+    """Whether each of positions has its bit set in bitmap"""
+    positions = np.asarray(positions, dtype=np.uint64)
+    return ((bitmap[positions >> np.uint64(6)] >> (positions & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+def code_membership(codes, num_values):
+    """Boolean matrix with a row per value, marking the destinations whose code is that value"""
+    return np.arange(num_values)[:, None] == np.asarray(codes)[None, :]
+
+def group_query(group_type, num_adults, num_children):
+    """
+    Query fields adjustment rule conditions can test
+    
+    Arguments may be scalars (one query) or column arrays (a batch of profiles).
+    
+    Returns:
+        Dict with group_type, num_adults, num_children and group_size
+    """
+    return {'group_type': group_type, 'num_adults': num_adults, 'num_children': num_children,
+            'group_size': num_adults + num_children}
+
+def season_masks(ranges):
+    """Month masks of a column of Best_Time_to_Visit values, parsing each distinct value once"""
+    codes, distinct = pd.factorize(np.asarray(ranges, dtype=object))
+    return np.array([month_mask(value) for value in distinct], dtype=np.uint16)[codes]
+
+def budget_closeness(budget_min, budget_max, min_budget, max_budget):
+    """Closeness of destination budget ranges to a requested range (1 for an exact match, towards 0 further away)"""
+    # Subtract in floating point, so narrow integer budget columns cannot overflow
+    return 1 / (1 + np.abs(np.subtract(budget_min, min_budget, dtype=float))
+                + np.abs(np.subtract(budget_max, max_budget, dtype=float)))
+
+
+class BudgetIntervalIndex:
+    """
+    Sorted-endpoint index over the [Budget_Min, Budget_Max] ranges of a catalog
+    
+    Keeps the destinations ordered by each endpoint, so containment and overlap
+    queries find their bounds with a binary search and only filter the smaller
+    of the two candidate runs, and nearest-range queries widen a window around
+    the requested minimum until no destination outside it can be closer.
+    """
+    def __init__(self, budget_min, budget_max, by_min=None, by_max=None):
+        """
+        Build the index from the per-destination budget endpoints
+        
+        Args:
+            budget_min: Budget_Min of every destination
+            budget_max: Budget_Max of every destination
+            by_min: Destination positions ordered by Budget_Min, if already known
+            by_max: Destination positions ordered by Budget_Max, if already known
+        """
+        self.budget_min = np.asarray(budget_min)
+        self.budget_max = np.asarray(budget_max)
+        positions = code_dtype(len(self.budget_min))
+        self.by_min = np.argsort(self.budget_min, kind='stable').astype(positions) if by_min is None else by_min
+        self.by_max = np.argsort(self.budget_max, kind='stable').astype(positions) if by_max is None else by_max
+        self.sorted_min = self.budget_min[self.by_min]
+        self.sorted_max = self.budget_max[self.by_max]
+        # Smallest Budget_Max among the destinations at or after each position of by_min
+        self.suffix_min_max = np.minimum.accumulate(self.budget_max[self.by_min][::-1])[::-1]
+        
+    def __len__(self):
+        return len(self.budget_min)
+    
+    def any_contained(self, low, high):
+        """Whether any destination range lies inside [low, high], in logarithmic time"""
+        start = np.searchsorted(self.sorted_min, low, side='left')
+        return bool(start < len(self) and self.suffix_min_max[start] <= high)
+    
+    def any_contained_batch(self, low, high):
+        """any_contained for arrays of lows and highs"""
+        start = np.searchsorted(self.sorted_min, low, side='left')
+        found = start < len(self)
+        return found & (self.suffix_min_max[np.minimum(start, len(self) - 1)] <= high)
+    
+    def contained(self, low, high):
+        """Positions (ascending) of destinations with low <= Budget_Min and Budget_Max <= high"""
+        above_low = self.by_min[np.searchsorted(self.sorted_min, low, side='left'):]
+        below_high = self.by_max[:np.searchsorted(self.sorted_max, high, side='right')]
+        if len(above_low) <= len(below_high):
+            rows = above_low[self.budget_max[above_low] <= high]
+        else:
+            rows = below_high[self.budget_min[below_high] >= low]
+        return np.sort(rows)
+    
+    def overlapping(self, low, high):
+        """Positions (ascending) of destinations with Budget_Min <= high and Budget_Max >= low"""
+        below_high = self.by_min[:np.searchsorted(self.sorted_min, high, side='right')]
+        above_low = self.by_max[np.searchsorted(self.sorted_max, low, side='left'):]
+        if len(below_high) <= len(above_low):
+            rows = below_high[self.budget_max[below_high] >= low]
+        else:
+            rows = above_low[self.budget_min[above_low] <= high]
+        return np.sort(rows)
+    
+    def nearest(self, low, high, top_n):
+        """
+        Positions of the top_n destinations with the highest budget_closeness to
+        [low, high], closest first and ties broken by position
+        """
+        top_n = min(max(int(top_n), 0), len(self))
+        if top_n == 0:
+            return np.empty(0, dtype=np.intp)
+        center = np.searchsorted(self.sorted_min, low)
+        width = max(top_n, 1)
+        while True:
+            start, stop = max(center - width, 0), min(center + width, len(self))
+            rows = self.by_min[start:stop]
+            closeness = budget_closeness(self.budget_min[rows], self.budget_max[rows], low, high)
+            if start == 0 and stop == len(self):
+                break
+            # Every destination outside the window is at least this far from low
+            # in Budget_Min alone, which bounds its closeness from above
+            gap = min(low - self.sorted_min[start - 1] if start > 0 else np.inf,
+                      self.sorted_min[stop] - low if stop < len(self) else np.inf)
+            if len(rows) >= top_n and np.partition(-closeness, top_n - 1)[top_n - 1] < -1 / (1 + gap):
+                break
+            width *= 2
+        order = np.argsort(rows, kind='stable')
+        return rows[order][top_rows(closeness[order], top_n)]
+
+
+class FacetIndex:
+    """
+    Bitmap index over the facet values of a catalog
+    
+    Every value of a facet keeps a bitmap of the destinations holding it (see
+    pack_bits). A selection ORs the bitmaps of the values chosen within a facet
+    and ANDs the facets together, and the count of every value under the
+    selection is a popcount of its bitmap ANDed with the other facets, so
+    matching and counting take one pass over the bitmaps. A facet's bitmaps
+    are packed the first time it is used.
+    """
+    def __init__(self, num_rows, facets):
+        """
+        Args:
+            num_rows: Number of destinations
+            facets: Dict of facet name to a function returning (values, membership),
+                membership being a boolean matrix with a row per value and a
+                column per destination
+        """
+        self.num_rows = num_rows
+        self.num_words = -(-num_rows // 64)
+        self._builders = dict(facets)
+        self._facets = {}
+        self.all_rows = pack_bits(np.ones(num_rows, dtype=bool), self.num_words)
+        self.all_rows.flags.writeable = False
+        
+    @property
+    def names(self):
+        return list(self._builders)
+        
+    def facet(self, name):
+        """
+        Values of a facet held by at least one destination, and their bitmaps
+        
+        Returns:
+            Tuple (values, bitmaps) with bitmaps a uint64 matrix holding a row per value
+        """
+        facet = self._facets.get(name)
+        if facet is None:
+            if name not in self._builders:
+                raise ValueError(f"Unknown facet '{name}', expected one of {', '.join(self._builders)}")
+            values, membership = self._builders[name]()
+            held = membership.any(axis=1)
+            bitmaps = pack_bits(membership[held], self.num_words)
+            bitmaps.flags.writeable = False
+            facet = self._facets[name] = ([value for value, keep in zip(values, held) if keep], bitmaps)
+        return facet
+        
+    def select(self, selection=None):
+        """
+        Match a selection and count every facet value under it
+        
+        Args:
+            selection: Dict of facet name to the values chosen in it; a facet with
+                no values chosen does not filter, and values no destination holds
+                match nothing
+                
+        Returns:
+            Tuple (bitmap, counts) with the bitmap of the matching destinations and
+            counts mapping every facet to a dict of value to the number of
+            destinations holding it that match the other facets' selection
+        """
+        selection = selection or {}
+        unknown = set(selection) - set(self._builders)
+        if unknown:
+            raise ValueError(f"Unknown facets: {', '.join(sorted(map(str, unknown)))}")
+        
+        # Each facet's mask ORs its chosen values
+        facets = [self.facet(name) for name in self._builders]
+        masks = []
+        for name, (values, bitmaps) in zip(self._builders, facets):
+            chosen = set(selection.get(name) or [])
+            if not chosen:
+                masks.append(self.all_rows)
+                continue
+            rows = [i for i, value in enumerate(values) if value in chosen]
+            masks.append(np.bitwise_or.reduce(bitmaps[rows], axis=0) if rows else np.zeros_like(self.all_rows))
+            
+        # AND of the facets before and after each one, so every facet is counted
+        # against the selection of all the others
+        before = [self.all_rows]
+        for mask in masks[:-1]:
+            before.append(before[-1] & mask)
+        after = [self.all_rows]
+        for mask in masks[:0:-1]:
+            after.append(after[-1] & mask)
+        after.reverse()
+        
+        counts = {}
+        for name, (values, bitmaps), prior, rest in zip(self._builders, facets, before, after):
+            others = prior & rest
+            counts[name] = dict(zip(values, np.bitwise_count(bitmaps & others).sum(axis=1).tolist()))
+        return before[-1] & masks[-1], counts
+        
+    def nbytes(self):
+        """Bytes held by the bitmaps packed so far"""
+        return self.all_rows.nbytes + sum(bitmaps.nbytes for _, bitmaps in self._facets.values())
+        
+
+class AdjustmentRule:
+    """
+    Declarative score adjustment for a group composition
+    
+    The final score of every destination matching the row predicates is
+    multiplied by multiplier for queries meeting the conditions. Conditions
+    and predicates are (name, operator, value) triples with an operator from
+    RULE_OPERATORS, all of which must hold: condition names are group_query
+    fields and predicate names catalog columns. The recommender compiles the
+    predicates into one boolean mask over the catalog per version, so applying
+    a rule is a single vectorized multiply.
+    """
+    def __init__(self, name, when, rows, multiplier):
+        """
+        Args:
+            name: Name of the rule
+            when: Conditions on the query, e.g. [('num_children', '>', 3)]
+            rows: Predicates on the destinations, e.g. [('Type', 'in', ['Beach'])]
+            multiplier: Factor applied to the final score of matching destinations
+        """
+        self.name = name
+        self.when = tuple((field, operator, value) for field, operator, value in when)
+        self.rows = tuple((column, operator, value) for column, operator, value in rows)
+        self.multiplier = multiplier
+        unknown = {operator for _, operator, _ in self.when + self.rows} - set(RULE_OPERATORS)
+        if unknown:
+            raise ValueError(f"Unknown rule operators: {', '.join(sorted(map(str, unknown)))}")
+        
+    def applies(self, query):
+        """
+        Whether the rule applies to a query
+        
+        Args:
+            query: Query fields as returned by group_query
+            
+        Returns:
+            Boolean, or a boolean array shaped like the query's array fields
+        """
+        applies = True
+        for field, operator, value in self.when:
+            applies = applies & RULE_OPERATORS[operator](query[field], value)
+        return applies
+        
+    def __repr__(self):
+        return f"AdjustmentRule({self.name!r}, when={list(self.when)}, rows={list(self.rows)}, multiplier={self.multiplier})"
+
+
+# Default adjustments for the group composition, applied in order
+GROUP_RULES = [
+    # Boost family-friendly destinations for groups with more than three children
+    AdjustmentRule('family_boost', when=[('num_children', '>', 3)],
+                   rows=[('Type', 'in', FAMILY_BOOST_TYPES)], multiplier=1.3),
+    # Penalize adventure destinations for groups with more than three (but fewer than 12) children
+    AdjustmentRule('young_children_adventure_penalty', when=[('num_children', '>', 3), ('num_children', '<', 12)],
+                   rows=[('Type', 'in', ADVENTURE_PENALTY_TYPES)], multiplier=0.6)
+]
+
+
+class PartialScoreCache:
+    """
+    Memoized query-independent parts of the hybrid score for one catalog version
+    
+    The demographic, popularity and season terms of a hybrid score only depend
+    on the group type, the large group flag and the trip's month mask, so their
+    weighted sum (the partial score) is computed once per key for the whole
+    catalog (or one shard's range of it) and a query only adds preference
+    similarity and budget fit to it.
+    Vectors are kept least recently used first out, within max_bytes.
+    """
+    def __init__(self, compute, max_bytes=PARTIAL_SCORE_CACHE_BYTES):
+        """
+        Args:
+            compute: Function of a key returning its partial score vector
+            max_bytes: Largest total size of the kept vectors
+        """
+        self.compute = compute
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._vectors = OrderedDict()
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        
+    def get(self, key):
+        """Partial score vector of a (group type, large group, month mask, span) key"""
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                self._stats['hits'] += 1
+                return vector
+            self._stats['misses'] += 1
+            
+        # Compute outside the lock, so concurrent misses do not wait for each other
+        vector = self.compute(key)
+        vector.flags.writeable = False
+        with self._lock:
+            if key not in self._vectors and vector.nbytes <= self.max_bytes:
+                self._vectors[key] = vector
+                self._bytes += vector.nbytes
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._vectors.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+                    self._stats['evictions'] += 1
+        return vector
+        
+    def nbytes(self):
+        """Bytes held by the kept vectors"""
+        return self._bytes
+        
+    def stats(self):
+        """
+        Cache statistics
+        
+        Returns:
+            Dict with the hit, miss and eviction counts, the number of kept
+            vectors, their bytes and the byte bound
+        """
+        with self._lock:
+            return dict(self._stats, entries=len(self._vectors), bytes=self._bytes, max_bytes=self.max_bytes)
+        
 
 class IndianTravelRecommender:
     """
     Hybrid travel recommendation system for Indian destinations
     Combines content-based, popularity-based, and demographic filtering
     """
-    def __init__(self, data_path='expanded_indian_destinations.csv'):
-        """Initialize with the dataset"""
-        self.df = pd.read_csv(data_path)
-        self.prepare_data()
+    def __init__(self, data_path='expanded_indian_destinations.csv', use_compiled=True, cache_dir=None,
+                 metrics_sink=None, data_format=None, group_rules=None, topk_mode='scan',
+                 partial_cache_bytes=PARTIAL_SCORE_CACHE_BYTES):
+        """
+        Initialize with the dataset
         
+        Args:
+            data_path: Catalog file (CSV, Parquet or Arrow IPC, see catalog_io), or a
+                compiled artifact directory
+            use_compiled: Load the compiled artifact of data_path (see catalog_artifact)
+                instead of reading the catalog file, when an up-to-date one exists
+            cache_dir: Directory holding compiled artifacts (next to data_path when None)
+            metrics_sink: Optional sink (see query_metrics) receiving the wall time and
+                rows touched of every stage of each hybrid query; None disables
+                the instrumentation
+            data_format: Format of data_path: 'csv', 'parquet' or 'arrow' (from its
+                extension when None)
+            group_rules: AdjustmentRules applied to hybrid scores, in order
+                (GROUP_RULES when None)
+            topk_mode: How hybrid queries find their top_n, one of TOPK_MODES
+            partial_cache_bytes: Memory bound of the memoized partial score vectors
+                (see PartialScoreCache)
+        """
+        if topk_mode not in TOPK_MODES:
+            raise ValueError(f"Unknown top-k mode '{topk_mode}', expected one of {', '.join(TOPK_MODES)}")
+        started = time.perf_counter()
+        self.startup_timings = {}
+        self.metrics_sink = metrics_sink
+        self.group_rules = list(GROUP_RULES if group_rules is None else group_rules)
+        self.topk_mode = topk_mode
+        self.partial_cache_bytes = partial_cache_bytes
+        self._update_lock = threading.Lock()
+        if os.path.isdir(data_path):
+            compiled_path = data_path
+        else:
+            compiled_path = find_artifact(data_path, cache_dir) if use_compiled else None
+            
+        if compiled_path:
+            self._load_compiled(compiled_path, started)
+        else:
+            data_format = catalog_format(data_path, data_format)
+            self.df = read_catalog(data_path, data_format)
+            self._record_timing(f'read_{data_format}', started)
+            self.prepare_data()
+        
+    def _record_timing(self, stage, started):
+        """Record the time since started for a startup stage and return the current time"""
+        now = time.perf_counter()
+        self.startup_timings[stage] = now - started
+        return now
+    
     def prepare_data(self):
         """Prepare and preprocess the data"""
-        # Extract unique preference keywords
-        all_preferences = []
-        for prefs in self.df['Preferences'].str.split(', '):
-            all_preferences.extend(prefs)
-        self.unique_preferences = list(set(all_preferences))
+        if not hasattr(self, 'startup_timings'):
+            self.startup_timings = {}
+        started = time.perf_counter()
         
-        # Create one-hot encoding for preferences
-        for pref in self.unique_preferences:
-            self.df[f'pref_{pref}'] = self.df['Preferences'].apply(lambda x: 1 if pref in x else 0)
+        # Store the catalog columns in compact dtypes
+        self.df = compact_catalog(self.df)
+        started = self._record_timing('compact_dtypes', started)
         
-        # Create one-hot encoding for types
-        self.df = pd.concat([self.df, pd.get_dummies(self.df['Type'], prefix='type')], axis=1)
+        # Split the preference lists into exact keywords in one vectorized pass,
+        # giving each keyword a column and each destination its keyword columns
+        keywords = split_preferences(self.df['Preferences'])
+        columns, vocabulary = pd.factorize(keywords, sort=True)
+        self.unique_preferences = list(vocabulary)
+        pref_matrix, self.pref_norms = preference_matrix(keywords.index.to_numpy(), columns, len(self.df),
+                                                         len(self.unique_preferences))
+        self.pref_postings = pref_matrix.tocsc()
+        started = self._record_timing('preference_encoding', started)
+        
+        # Encode types as integer codes into the sorted list of type names
+        type_codes, type_names = pd.factorize(self.df['Type'], sort=True)
+        self.type_names = list(type_names)
+        self.type_codes = type_codes.astype(code_dtype(len(self.type_names)))
+        started = self._record_timing('type_encoding', started)
         
         # Normalize popularity score
         scaler = MinMaxScaler()
         self.df['Normalized_Popularity'] = scaler.fit_transform(self.df[['Popularity_Score']])
+        started = self._record_timing('popularity_scaling', started)
+        
+        # Compile every Best_Time_to_Visit range into a month bitmask once, parsing
+        # each distinct range string a single time
+        self.season_masks = season_masks(self.df['Best_Time_to_Visit'])
+        started = self._record_timing('season_masks', started)
+        
+        self._build_indexes()
+        self._record_timing('indexes', started)
+        
+    def _build_indexes(self, column_arrays=None, budget_orders=(None, None), pref_bits=None):
+        """
+        Derive the query-time lookups from the prepared catalog and freeze it
+        
+        Args:
+            column_arrays: Numeric column arrays to score with (taken from self.df when None)
+            budget_orders: Destination positions sorted by Budget_Min and by Budget_Max, if known
+            pref_bits: Bit-packed preference rows, if already known
+        """
+        self.pref_positions = {pref: i for i, pref in enumerate(self.unique_preferences)}
+        self.catalog_version = next(_catalog_versions)
+        
+        # Destination orderings for browsing and by query-independent score
+        # components, sorted on first use
+        self._browse_orders = {}
+        self._score_orders = {}
+        
+        # Each destination's keywords as packed bits, for popcount similarity; the
+        # inverted index pref_postings lists the destinations offering keyword i
+        # (ascending) as pref_postings.indices[pref_postings.indptr[i]:pref_postings.indptr[i + 1]]
+        self.pref_bits = preference_bits(self.pref_postings) if pref_bits is None else pref_bits
+        
+        # Hash index from destination name to its row (the first one for repeated names)
+        names = self.df['Destination_Name'].tolist()
+        self.name_index = dict(zip(reversed(names), range(len(names) - 1, -1, -1)))
+        
+        # Numeric columns used for scoring, and the index over the budget ranges
+        if column_arrays is None:
+            column_arrays = {column: self.df[column].to_numpy() for column in NUMERIC_COLUMNS + ['Normalized_Popularity']}
+        self.column_arrays = column_arrays
+        self.popularity = self.column_arrays['Normalized_Popularity']
+        self.budget_index = BudgetIntervalIndex(self.column_arrays['Budget_Min'], self.column_arrays['Budget_Max'],
+                                                *budget_orders)
+        
+        # Facet bitmaps for filtered browsing, packed on first use
+        self.facet_index = self._facet_index()
+        
+        # Compile the row predicates of the group adjustment rules into boolean masks
+        self.rule_masks = [self._rule_mask(rule) for rule in self.group_rules]
+        
+        # Partial score vectors, computed on first use from this version (a
+        # snapshot, since the next version replaces the attributes of self)
+        self.partial_scores = PartialScoreCache(self.snapshot()._partial_score_vector, self.partial_cache_bytes)
+        
+        # The catalog is read-only from here on: every query keeps its scores in
+        # local arrays, so one instance can be shared between threads and sessions
+        for array in (self.pref_postings.data, self.pref_postings.indices, self.pref_postings.indptr, self.pref_bits,
+                      self.pref_norms, self.popularity, self.season_masks, self.type_codes,
+                      *self.rule_masks, *self.column_arrays.values(),
+                      self.budget_index.by_min, self.budget_index.by_max):
+            array.flags.writeable = False
+        
+    @on_snapshot
+    def compiled_catalog(self):
+        """
+        Describe the prepared catalog as flat arrays for a compiled artifact
+        
+        Category columns are stored as integer codes plus their sorted categories
+        and the other text columns as UTF-8 bytes plus offsets, so every array is
+        plain numeric or short fixed-width text and can be memory-mapped.
+        
+        Returns:
+            Tuple (manifest, arrays) as written by catalog_artifact.write_artifact
+        """
+        manifest = {
+            'rows': len(self.df),
+            'columns': list(self.df.columns),
+            'category_columns': [column for column in self.df.columns
+                                 if isinstance(self.df[column].dtype, pd.CategoricalDtype)],
+            'text_columns': [column for column in self.df.columns
+                             if not pd.api.types.is_numeric_dtype(self.df[column])
+                             and not isinstance(self.df[column].dtype, pd.CategoricalDtype)],
+            'unique_preferences': self.unique_preferences,
+            'type_names': self.type_names
+        }
+        arrays = {
+            'pref_data': self.pref_postings.data,
+            'pref_indices': self.pref_postings.indices,
+            'pref_indptr': self.pref_postings.indptr,
+            'pref_norms': self.pref_norms,
+            'pref_bits': self.pref_bits,
+            'type_codes': self.type_codes,
+            'season_masks': self.season_masks,
+            'budget_by_min': self.budget_index.by_min,
+            'budget_by_max': self.budget_index.by_max
+        }
+        for column in self.df.columns:
+            if column in manifest['category_columns']:
+                arrays[f'codes_{column}'] = self.df[column].cat.codes.to_numpy()
+                arrays[f'categories_{column}'] = np.asarray(self.df[column].cat.categories, dtype=str)
+            elif column in manifest['text_columns']:
+                missing = self.df[column].isna().to_numpy()
+                arrays[f'offsets_{column}'], arrays[f'text_{column}'] = encode_text(self.df[column].fillna(''))
+                if missing.any():
+                    arrays[f'missing_{column}'] = missing
+            else:
+                arrays[f'column_{column}'] = self.df[column].to_numpy()
+        return manifest, arrays
+    
+    def _load_compiled(self, path, started):
+        """Load the prepared catalog from a compiled artifact instead of parsing the CSV"""
+        manifest, arrays = read_artifact(path)
+        columns = {}
+        for column in manifest['columns']:
+            if column in manifest['category_columns']:
+                columns[column] = pd.Categorical.from_codes(arrays[f'codes_{column}'],
+                                                            pd.Index(arrays[f'categories_{column}'], dtype='str'))
+            elif column in manifest['text_columns']:
+                columns[column] = decode_text(arrays[f'offsets_{column}'], arrays[f'text_{column}'])
+                if f'missing_{column}' in arrays:
+                    columns[column] = pd.Series(columns[column]).mask(arrays[f'missing_{column}']).array
+            else:
+                columns[column] = arrays[f'column_{column}']
+        self.df = pd.DataFrame(columns, copy=False)
+        started = self._record_timing('load_artifact', started)
+        
+        self.unique_preferences = manifest['unique_preferences']
+        self.type_names = manifest['type_names']
+        self.pref_postings = sparse.csc_matrix((arrays['pref_data'], arrays['pref_indices'], arrays['pref_indptr']),
+                                               shape=(manifest['rows'], len(self.unique_preferences)))
+        self.pref_norms = arrays['pref_norms']
+        self.type_codes = arrays['type_codes']
+        self.season_masks = arrays['season_masks']
+        
+        # Score straight from the memory-mapped arrays so they stay shared
+        column_arrays = {column: arrays[f'column_{column}'] for column in NUMERIC_COLUMNS + ['Normalized_Popularity']}
+        self._build_indexes(column_arrays, (arrays['budget_by_min'], arrays['budget_by_max']), arrays['pref_bits'])
+        self._record_timing('indexes', started)
+        
+    def startup_report(self):
+        """
+        Report how long each startup stage took
+        
+        Returns:
+            String with one line per stage and its share of the total startup time
+        """
+        total = sum(self.startup_timings.values())
+        report = f"Startup timings ({len(self.df)} destinations, {len(self.unique_preferences)} preferences):\n"
+        for stage, seconds in self.startup_timings.items():
+            share = seconds / total if total else 0
+            report += f"- {stage}: {seconds * 1000:.2f} ms ({share:.1%})\n"
+        report += f"- total: {total * 1000:.2f} ms\n"
+        return report
+        
+    def memory_usage(self):
+        """
+        Bytes held by each structure of the current catalog version
+        
+        Memory-mapped arrays (from a compiled artifact) are counted under
+        'mapped', since their pages are shared through the page cache rather
+        than owned by this process. The name index counts its hash table only;
+        its keys are the destination names.
+        
+        Returns:
+            Dict of structure name to bytes
+        """
+        usage = {}
+        # Arrays counted so far by memory region (kept referenced, so a freed
+        # temporary's address cannot be reused by the next one)
+        seen = {}
+        def add(name, *arrays):
+            for array in arrays:
+                # Count every memory region once; views of one pandas block are
+                # separate regions, the same column held twice is not
+                region = (array.__array_interface__['data'][0], array.nbytes)
+                if region in seen:
+                    continue
+                seen[region] = array
+                base = array
+                while isinstance(base, np.ndarray) and base.base is not None:
+                    base = base.base
+                key = 'mapped' if isinstance(base, (np.memmap, memoryview)) or not isinstance(base, np.ndarray) else name
+                usage[key] = usage.get(key, 0) + array.nbytes
+        
+        for column in self.df.columns:
+            values = self.df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                add(f'df.{column}', values.cat.codes.to_numpy())
+                usage[f'df.{column}'] = (usage.get(f'df.{column}', 0) +
+                                         int(values.cat.categories.memory_usage(deep=True)))
+            elif isinstance(values.dtype, np.dtype) and values.dtype != object:
+                add(f'df.{column}', values.to_numpy())
+            else:
+                usage[f'df.{column}'] = int(values.memory_usage(deep=True, index=False))
+        add('pref_postings', self.pref_postings.data, self.pref_postings.indices, self.pref_postings.indptr)
+        add('pref_bits', self.pref_bits)
+        add('pref_norms', self.pref_norms)
+        add('type_codes', self.type_codes)
+        add('season_masks', self.season_masks)
+        add('rule_masks', *self.rule_masks)
+        add('column_arrays', *self.column_arrays.values())
+        index = self.budget_index
+        add('budget_index', index.by_min, index.by_max, index.sorted_min, index.sorted_max, index.suffix_min_max)
+        add('browse_orders', *self._browse_orders.values())
+        add('score_orders', *(array for order in self._score_orders.values() for array in order))
+        usage['partial_scores'] = self.partial_scores.nbytes()
+        usage['facet_index'] = self.facet_index.nbytes()
+        usage['name_index'] = sys.getsizeof(self.name_index)
+        return usage
+    
+    def memory_report(self):
+        """
+        Report the memory held by the catalog, largest structures first
+        
+        Returns:
+            String with one line per structure and its share of the total
+        """
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        report = f"Catalog memory ({len(self.df)} destinations):\n"
+        for name, size in sorted(usage.items(), key=lambda item: -item[1]):
+            share = size / total if total else 0
+            report += f"- {name}: {size / 2**20:.2f} MiB ({share:.1%})\n"
+        report += f"- total: {total / 2**20:.2f} MiB\n"
+        return report
+    
+    def snapshot(self):
+        """
+        Read-only view of the current catalog version
+        
+        Updates never modify a published version; they build the next one and
+        swap it in, so the view keeps answering from the version it was taken from.
+        """
+        view = object.__new__(type(self))
+        view.__dict__ = self.__dict__
+        return view
+    
+    def add_destinations(self, destinations):
+        """
+        Add destinations to the catalog
+        
+        Only the new rows are encoded: their keywords extend the preference
+        vocabulary (existing keywords keep their columns), and popularity is only
+        normalized again if the new rows change its minimum or maximum.
         
+        Args:
+            destinations: DataFrame (or list of dicts) with every catalog column
+            
+        Returns:
+            The new catalog version
+        """
+        destinations = self._catalog_rows(destinations)
+        with self._update_lock:
+            return self._apply_update(destinations)
+    
+    def update_destinations(self, changes):
+        """
+        Change catalog values of existing destinations
+        
+        Args:
+            changes: DataFrame (or list of dicts) with a Destination_Name column naming
+                the destinations to change and a column for every value to set;
+                a missing (or NaN) value leaves that field unchanged, and several
+                changes to one destination are applied in order
+                
+        Returns:
+            The new catalog version
+        """
+        changes = pd.DataFrame(changes)
+        unknown = set(changes.columns) - set(self.df.columns) - {'Normalized_Popularity'}
+        if unknown or 'Normalized_Popularity' in changes:
+            raise ValueError(f"Cannot update columns: {', '.join(sorted(unknown) or ['Normalized_Popularity'])}")
+        # The last value each destination sets in each column (groupby skips NaN)
+        changes = changes.groupby('Destination_Name', sort=False, dropna=False).last().reset_index()
+        with self._update_lock:
+            positions = self._positions(changes['Destination_Name'])
+            current = self.df.iloc[positions].reset_index(drop=True)
+            for column in changes.columns.drop('Destination_Name'):
+                changed = changes[column].notna().to_numpy()
+                values = current[column].to_numpy(dtype=object)
+                values[changed] = changes[column].to_numpy(dtype=object)[changed]
+                values = pd.Series(values).infer_objects()
+                if (pd.api.types.is_integer_dtype(current[column]) and pd.api.types.is_float_dtype(values)
+                        and (values % 1 == 0).all()):
+                    # Integers that only became floats next to the NaNs of unset fields
+                    values = values.astype(np.int64)
+                current[column] = values
+            order = np.arange(len(self.df))
+            order[positions] = len(self.df) + np.arange(len(positions))
+            return self._apply_update(self._catalog_rows(current), order)
+    
+    def remove_destinations(self, destination_names):
+        """
+        Remove destinations from the catalog
+        
+        Args:
+            destination_names: Names of the destinations to remove
+            
+        Returns:
+            The new catalog version
+        """
+        with self._update_lock:
+            keep = np.ones(len(self.df), dtype=bool)
+            keep[self._positions(destination_names)] = False
+            return self._apply_update(self._catalog_rows([]), np.flatnonzero(keep))
+    
+    def _catalog_rows(self, destinations):
+        """Destinations as a DataFrame with exactly the catalog source columns"""
+        destinations = pd.DataFrame(destinations)
+        columns = [column for column in self.df.columns if column != 'Normalized_Popularity']
+        missing = [column for column in columns if column not in destinations]
+        if missing and len(destinations):
+            raise ValueError(f"Destinations are missing columns: {', '.join(missing)}")
+        return destinations.reindex(columns=columns).reset_index(drop=True)
+    
+    def _positions(self, destination_names):
+        """Catalog positions of destination names, raising ValueError for unknown names"""
+        names = list(destination_names)
+        unknown = [name for name in names if name not in self.name_index]
+        if unknown:
+            raise ValueError(f"Unknown destinations: {', '.join(map(str, unknown))}")
+        return np.array([self.name_index[name] for name in names], dtype=np.intp)
+    
+    def _apply_update(self, new_rows, order=None):
+        """
+        Build the next catalog version and swap it in
+        
+        Args:
+            new_rows: Destinations to encode, as returned by _catalog_rows
+            order: Positions of the next version's rows in the current catalog
+                followed by new_rows (the current rows then new_rows when None)
+                
+        Returns:
+            The new catalog version
+        """
+        # The next version is built in a copy of the attribute dict, so the
+        # published version is never touched and the swap is a single assignment
+        draft = object.__new__(type(self))
+        draft.__dict__ = dict(self.__dict__)
+        draft._extend(new_rows, order)
+        self.__dict__ = draft.__dict__
+        return self.catalog_version
+    
+    def _extend(self, new_rows, order):
+        """Encode new_rows, append them to this (draft) catalog and reorder it by order"""
+        num_rows = len(self.df)
+        
+        # Keywords and types not seen before are appended to the vocabularies
+        keywords = split_preferences(new_rows['Preferences'])
+        self.unique_preferences = self.unique_preferences + [
+            keyword for keyword in pd.unique(keywords) if keyword not in self.pref_positions]
+        positions = {pref: i for i, pref in enumerate(self.unique_preferences)}
+        new_matrix, new_norms = preference_matrix(keywords.index.to_numpy(dtype=np.intp),
+                                                  keywords.map(positions).to_numpy(dtype=np.intp),
+                                                  len(new_rows), len(self.unique_preferences))
+        # The new keywords have empty posting lists in the current rows
+        indptr = self.pref_postings.indptr
+        indptr = np.concatenate([indptr, np.full(len(self.unique_preferences) + 1 - len(indptr), indptr[-1])])
+        old_matrix = sparse.csc_matrix((self.pref_postings.data, self.pref_postings.indices, indptr),
+                                       shape=(num_rows, len(self.unique_preferences))).tocsr()
+        pref_matrix = sparse.vstack([old_matrix, new_matrix], format='csr')
+        pref_norms = np.concatenate([self.pref_norms, new_norms])
+        
+        types = new_rows['Type'].tolist()
+        self.type_names = self.type_names + [name for name in dict.fromkeys(types) if name not in self.type_names]
+        type_positions = {name: i for i, name in enumerate(self.type_names)}
+        type_codes = np.concatenate([self.type_codes, np.array([type_positions[name] for name in types], dtype=np.intp)])
+        type_codes = type_codes.astype(code_dtype(len(self.type_names)))
+        masks = np.concatenate([self.season_masks, season_masks(new_rows['Best_Time_to_Visit'])])
+        
+        df = self.df.drop(columns='Normalized_Popularity')
+        if len(new_rows):
+            new_rows = new_rows.copy()
+            for column in df.columns:
+                if isinstance(df[column].dtype, pd.CategoricalDtype):
+                    # Give both parts the same categories so the column stays categorical
+                    values = new_rows[column].astype(object)
+                    categories = df[column].cat.categories
+                    unseen = values[values.notna() & ~values.isin(categories)]
+                    categories = categories.append(pd.Index(pd.unique(unseen)))
+                    df[column] = df[column].cat.set_categories(categories)
+                    new_rows[column] = pd.Categorical(values, categories=categories)
+            df = compact_catalog(pd.concat([df, new_rows], ignore_index=True))
+        normalized = np.concatenate([self.popularity, np.zeros(len(new_rows))])
+        added = np.arange(num_rows, num_rows + len(new_rows))
+        if order is not None:
+            pref_matrix, pref_norms = pref_matrix[order], pref_norms[order]
+            type_codes, masks, normalized = type_codes[order], masks[order], normalized[order]
+            df = df.iloc[order].reset_index(drop=True)
+            added = np.flatnonzero(order >= num_rows)
+        self.pref_postings, self.pref_norms = pref_matrix.tocsc(), pref_norms
+        self.type_codes, self.season_masks = type_codes, masks
+        
+        # Keep the popularity scaling unless the minimum or maximum has moved
+        old_popularity = self.column_arrays['Popularity_Score']
+        popularity = df[['Popularity_Score']]
+        old_range = (old_popularity.min(), old_popularity.max()) if len(old_popularity) else None
+        if len(df) and old_range == (popularity.iloc[:, 0].min(), popularity.iloc[:, 0].max()):
+            # Scale just the new rows, with the scaler the current rows were scaled with
+            if len(added):
+                scaler = MinMaxScaler().fit(np.array(old_range).reshape(-1, 1))
+                normalized[added] = scaler.transform(popularity.iloc[added].to_numpy())[:, 0]
+        elif len(df):
+            normalized = MinMaxScaler().fit_transform(popularity)[:, 0]
+        df['Normalized_Popularity'] = normalized
+        self.df = df
+        self._build_indexes()
+    
+    def _column(self, column, rows=None):
+        """Values of a numeric catalog column, for all destinations or only the given rows"""
+        values = self.column_arrays[column]
+        return values if rows is None else values[rows]
+    
+    def _preference_positions(self, preferences):
+        """Column positions of the known preference keywords in a query"""
+        if isinstance(preferences, str):
+            preferences = preferences.split(',')
+        return sorted({self.pref_positions[pref.strip()] for pref in preferences if pref.strip() in self.pref_positions})
+    
+    def _preference_similarity(self, preferences, rows=None):
+        """
+        Cosine similarity between a list of preference keywords and every destination
+        
+        Args:
+            preferences: List of preference keywords
+            rows: Positions of the destinations to score (all destinations when None)
+            
+        Returns:
+            Array with one similarity value per destination (0 when nothing overlaps)
+        """
+        pref_norms = self.pref_norms if rows is None else self.pref_norms[rows]
+        positions = self._preference_positions(preferences)
+        if not positions:
+            return np.zeros(len(pref_norms))
+        
+        # Overlap counts are popcounts of the AND with the query's bits, summed
+        # over the words holding a query keyword (uint8 holds any overlap of a
+        # query with fewer than 256 keywords)
+        query_bits = {}
+        for position in positions:
+            query_bits[position >> 6] = query_bits.get(position >> 6, 0) | (1 << (position & 63))
+        overlap = np.zeros(len(pref_norms), dtype=np.uint8 if len(positions) < 256 else np.int64)
+        for word, bits in query_bits.items():
+            word_bits = self.pref_bits[word] if rows is None else self.pref_bits[word][rows]
+            overlap += np.bitwise_count(word_bits & np.uint64(bits))
+        return np.divide(overlap, pref_norms * np.sqrt(len(positions)),
+                         out=np.zeros(len(pref_norms)), where=pref_norms > 0)
+    
+    def _preference_candidates(self, preferences):
+        """
+        Destinations sharing at least one keyword with a query, from the inverted index
+        
+        Only the posting lists of the query keywords are read, so the work grows
+        with the number of matching destinations rather than the catalog size.
+        
+        Returns:
+            Tuple (positions, similarity) with the matching destinations in ascending
+            order and their cosine similarity to the query
+        """
+        positions = self._preference_positions(preferences)
+        postings = self.pref_postings
+        matches = [postings.indices[postings.indptr[i]:postings.indptr[i + 1]] for i in positions]
+        if not matches:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        rows, overlap = np.unique(np.concatenate(matches), return_counts=True)
+        return rows, overlap / (self.pref_norms[rows] * np.sqrt(len(positions)))
+    
+    def _demographic_score(self, group_type, large_group, rows=None):
+        """
+        Demographic suitability of every destination for a travel group
+        
+        Args:
+            group_type: Type of travel group ('Family', 'Solo', 'Couple', 'Senior')
+            large_group: Whether the group has more than four people
+            rows: Positions of the destinations to score (all destinations when None)
+            
+        Returns:
+            Array with one score (on the 1-5 rating scale) per destination
+        """
+        family = self._column('Family_Friendly', rows)
+        if group_type in DEMOGRAPHIC_COLUMNS:
+            demo_score = self._column(DEMOGRAPHIC_COLUMNS[group_type], rows)
+        else:
+            # Default scoring
+            demo_score = (family.astype(float) + self._column('Solo_Travel', rows) +
+                          self._column('Couple_Friendly', rows) + self._column('Senior_Friendly', rows)) / 4
+        
+        if large_group:
+            # Larger groups might prefer certain destinations
+            # Boost family-friendly places for larger groups
+            demo_score = demo_score * (family / 3)
+        return demo_score
+    
+    def _budget_fit(self, min_budget, max_budget, rows=None):
+        """
+        Budget fit of every destination for a per-day budget range
+        
+        Args:
+            min_budget: Minimum budget, a scalar or a column of per-profile values
+            max_budget: Maximum budget, a scalar or a column of per-profile values
+            rows: Positions of the destinations to score (all destinations when None)
+            
+        Returns:
+            Array that is 1 for destinations inside the range and 0 otherwise, or a
+            closeness score for every destination when nothing is inside the range
+        """
+        budget_min = self._column('Budget_Min', rows)
+        budget_max = self._column('Budget_Max', rows)
+        budget_filter = (budget_min >= min_budget) & (budget_max <= max_budget)
+        if np.ndim(min_budget) == 0 and np.ndim(max_budget) == 0:
+            # A single query asks the index whether anything is inside the range
+            # instead of scanning every destination
+            if self.budget_index.any_contained(min_budget, max_budget):
+                return budget_filter.astype(float)
+            return budget_closeness(budget_min, budget_max, min_budget, max_budget)
+        
+        any_contained = self.budget_index.any_contained_batch(np.ravel(min_budget), np.ravel(max_budget))
+        closeness = budget_closeness(budget_min, budget_max, min_budget, max_budget)
+        return np.where(any_contained[:, None], budget_filter.astype(float), closeness)
+    
+    def _season_match(self, trip_mask, rows=None):
+        """
+        Seasonal match of every destination for a trip window
+        
+        Args:
+            trip_mask: Month mask of the travel window (see month_mask); 0 means
+                no seasonality is considered
+            rows: Positions of the destinations to score (all destinations when None)
+                
+        Returns:
+            Array that is 1.0 for destinations in season for the whole window,
+            0.3 for destinations in season for none of it, and proportionally in
+            between for multi-month windows
+        """
+        season_masks = self.season_masks if rows is None else self.season_masks[rows]
+        if not trip_mask:
+            return np.ones(len(season_masks))
+        covered = np.bitwise_count(season_masks & np.uint16(trip_mask))
+        return 0.3 + 0.7 * (covered / int(trip_mask).bit_count())
+    
+    def _final_score(self, similarity, partial_score, budget_fit, group, rows=None):
+        """
+        Weighted hybrid score with the group composition adjustments applied
+        
+        All arguments broadcast, so the same arithmetic scores a single query
+        (1-D arrays, scalar group fields) or a batch of profiles (2-D arrays,
+        group fields as columns).
+        """
+        final_score = self._weighted_score(similarity, partial_score, budget_fit)
+        return self._apply_group_rules(final_score, group, rows)
+    
+    def _weighted_score(self, similarity, partial_score, budget_fit):
+        """Weighted average of the query-dependent scores and the partial score"""
+        return partial_score + 0.35 * similarity + 0.10 * budget_fit
+    
+    def _partial_score(self, group_type, large_group, trip_mask, rows=None, span=None):
+        """
+        Demographic, popularity and season terms of the hybrid score, memoized per key
+        
+        Args:
+            group_type: Type of travel group
+            large_group: Whether the group has more than four people
+            trip_mask: Month mask of the travel window (see month_mask)
+            rows: Positions of the destinations to score (all destinations when None)
+            span: Range (start, stop) of positions holding every row, so only that
+                range is computed and memoized (the whole catalog when None)
+        """
+        key = (group_type if group_type in DEMOGRAPHIC_COLUMNS else None, bool(large_group), int(trip_mask),
+               None if span is None else (int(span[0]), int(span[1])))
+        partial_score = self.partial_scores.get(key)
+        if rows is None:
+            return partial_score
+        return partial_score[rows if span is None else rows - span[0]]
+    
+    def _partial_score_vector(self, key):
+        """Partial score for a (group type, large group, month mask, span) key"""
+        group_type, large_group, trip_mask, span = key
+        rows = None if span is None else slice(*span)
+        popularity = self.popularity if rows is None else self.popularity[rows]
+        return (
+            0.25 * (self._demographic_score(group_type, large_group, rows) / 5) +  # Normalize to 0-1
+            0.20 * popularity +
+            0.10 * self._season_match(trip_mask, rows)
+        )
+    
+    def _apply_group_rules(self, final_score, group, rows=None):
+        """
+        Boost or penalize destinations for the group composition
+        
+        Args:
+            final_score: Weighted scores
+            group: Query fields as returned by group_query
+            rows: Positions the scores belong to (every destination when None)
+        """
+        for rule, mask in zip(self.group_rules, self.rule_masks):
+            applies = rule.applies(group)
+            if not np.any(applies):
+                continue
+            mask = mask if rows is None else mask[rows]
+            final_score = np.where(applies & mask, final_score * rule.multiplier, final_score)
+        return final_score
+    
+    def _rule_mask(self, rule):
+        """Boolean mask of the destinations matching every row predicate of an AdjustmentRule"""
+        mask = np.ones(len(self.df), dtype=bool)
+        for column, operator, value in rule.rows:
+            values = self.df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Test each distinct value once and gather through the codes (-1, a
+                # missing value, picks the trailing False)
+                distinct = np.append(RULE_OPERATORS[operator](values.cat.categories.to_numpy(), value), False)
+                mask &= distinct[values.cat.codes.to_numpy()]
+            else:
+                mask &= RULE_OPERATORS[operator](values.to_numpy(), value)
+        return mask
+    
+    def _build_result(self, rows, columns=None, **scores):
+        """
+        Build a result DataFrame for the given catalog rows
+        
+        Args:
+            rows: Positions of the destinations to return, in ranking order
+            columns: Columns to return, in order (all catalog columns followed by the scores when None)
+            **scores: Score arrays aligned with rows, attached as extra columns
+            
+        Returns:
+            DataFrame of the selected destinations
+        """
+        if columns is None:
+            result = self.df.iloc[rows]
+        else:
+            # Copy only the requested rows and columns out of the catalog
+            catalog_columns = [column for column in columns if column not in scores]
+            result = self.df.iloc[rows, self.df.columns.get_indexer(catalog_columns)]
+        result = result.assign(**scores)
+        return result if columns is None else result[columns]
+    
+    @on_snapshot
     def get_recommendation_by_preferences(self, preferences, top_n=5):
         """
         Content-based filtering based on user preferences
@@ -43,31 +1427,21 @@ class IndianTravelRecommender:
         Returns:
             DataFrame of recommended destinations
         """
-        # Create user preference vector
-        user_preferences = np.zeros(len(self.unique_preferences))
-        for i, pref in enumerate(self.unique_preferences):
-            if pref in preferences:
-                user_preferences[i] = 1
-                
-        # Calculate similarity between user preferences and destinations
-        destination_preferences = self.df[[f'pref_{pref}' for pref in self.unique_preferences]].values
-        similarities = []
-        
-        for dest_prefs in destination_preferences:
-            # Calculate cosine similarity
-            if np.sum(dest_prefs) > 0 and np.sum(user_preferences) > 0:
-                sim = np.dot(dest_prefs, user_preferences) / (np.linalg.norm(dest_prefs) * np.linalg.norm(user_preferences))
-            else:
-                sim = 0
-            similarities.append(sim)
-            
-        self.df['Preference_Similarity'] = similarities
+        # Only destinations sharing a keyword with the query can score above 0
+        candidates, similarity = self._preference_candidates(preferences)
+        rows = candidates[top_rows(similarity, top_n)]
         
-        # Return top results
-        result = self.df.sort_values('Preference_Similarity', ascending=False).head(top_n)
-        return result[['Destination_Name', 'State', 'Type', 'Best_Time_to_Visit', 'Preferences', 
-                     'Popularity_Score', 'Budget_Min', 'Budget_Max']]
+        # Fewer matches than requested: fill up with the first non-matching
+        # destinations, as they all score 0 and ties go by position
+        missing = min(int(top_n), len(self.df)) - len(rows)
+        if missing > 0:
+            first = np.arange(min(len(self.df), missing + len(candidates)))
+            rows = np.concatenate([rows, np.setdiff1d(first, candidates, assume_unique=True)[:missing]])
+            
+        return self._build_result(rows, ['Destination_Name', 'State', 'Type', 'Best_Time_to_Visit', 'Preferences', 
+                                         'Popularity_Score', 'Budget_Min', 'Budget_Max'])
     
+    @on_snapshot
     def get_recommendation_by_demographics(self, group_type, num_adults=1, num_children=0, top_n=5):
         """
         Demographic-based filtering based on travel group
@@ -81,35 +1455,15 @@ class IndianTravelRecommender:
         Returns:
             DataFrame of recommended destinations
         """
-        if group_type == 'Family':
-            # For families, prioritize family-friendly places
-            self.df['Demo_Score'] = self.df['Family_Friendly']
-        elif group_type == 'Solo':
-            # For solo travelers
-            self.df['Demo_Score'] = self.df['Solo_Travel']
-        elif group_type == 'Couple':
-            # For couples
-            self.df['Demo_Score'] = self.df['Couple_Friendly']
-        elif group_type == 'Senior':
-            # For senior travelers
-            self.df['Demo_Score'] = self.df['Senior_Friendly']
-        else:
-            # Default scoring
-            self.df['Demo_Score'] = (self.df['Family_Friendly'] + self.df['Solo_Travel'] + 
-                                  self.df['Couple_Friendly'] + self.df['Senior_Friendly']) / 4
-            
-        # Adjust for group size
-        total_people = num_adults + num_children
-        if total_people > 4:
-            # Larger groups might prefer certain destinations
-            # Boost family-friendly places for larger groups
-            self.df['Demo_Score'] = self.df['Demo_Score'] * (self.df['Family_Friendly'] / 3)
+        demo_score = self._demographic_score(group_type, num_adults + num_children > 4)
             
         # Return top results
-        result = self.df.sort_values('Demo_Score', ascending=False).head(top_n)
-        return result[['Destination_Name', 'State', 'Type', 'Best_Time_to_Visit', 'Preferences', 
-                     'Demo_Score', 'Popularity_Score', 'Budget_Min', 'Budget_Max']]
+        rows = top_rows(demo_score, top_n)
+        return self._build_result(rows, ['Destination_Name', 'State', 'Type', 'Best_Time_to_Visit', 'Preferences', 
+                                         'Demo_Score', 'Popularity_Score', 'Budget_Min', 'Budget_Max'],
+                                  Demo_Score=demo_score[rows])
     
+    @on_snapshot
     def get_recommendation_by_budget(self, min_budget=0, max_budget=float('inf'), top_n=5):
         """
         Budget-based filtering
@@ -122,20 +1476,20 @@ class IndianTravelRecommender:
         Returns:
             DataFrame of recommended destinations within budget range
         """
-        # Filter destinations within budget range
-        budget_filter = (self.df['Budget_Min'] >= min_budget) & (self.df['Budget_Max'] <= max_budget)
+        # Find destinations within budget range
+        candidates = self.budget_index.contained(min_budget, max_budget)
         
-        if budget_filter.sum() == 0:
+        if len(candidates) == 0:
             # If no exact matches, find closest matches
-            self.df['Budget_Fit'] = 1 / (1 + abs(self.df['Budget_Min'] - min_budget) + abs(self.df['Budget_Max'] - max_budget))
-            result = self.df.sort_values('Budget_Fit', ascending=False).head(top_n)
+            rows = self.budget_index.nearest(min_budget, max_budget, top_n)
         else:
             # Sort by popularity within budget constraints
-            result = self.df[budget_filter].sort_values('Popularity_Score', ascending=False).head(top_n)
+            rows = candidates[top_rows(self._column('Popularity_Score', candidates), top_n)]
             
-        return result[['Destination_Name', 'State', 'Type', 'Best_Time_to_Visit', 
-                       'Preferences', 'Budget_Min', 'Budget_Max', 'Popularity_Score']]
+        return self._build_result(rows, ['Destination_Name', 'State', 'Type', 'Best_Time_to_Visit', 
+                                         'Preferences', 'Budget_Min', 'Budget_Max', 'Popularity_Score'])
     
+    @on_snapshot
     def get_hybrid_recommendations(self, preferences, group_type='Family', num_adults=1, 
                                   num_children=0, min_budget=0, max_budget=float('inf'), 
                                   current_month=None, top_n=5):
@@ -149,125 +1503,472 @@ class IndianTravelRecommender:
             num_children: Number of children
             min_budget: Minimum budget per person per day
             max_budget: Maximum budget per person per day
-            current_month: Current month to consider seasonality (optional)
+            current_month: Month of travel to consider seasonality (optional); a
+                range such as 'October-December' or a list of months scores a
+                multi-month trip window
             top_n: Number of recommendations to return
             
         Returns:
             DataFrame of recommended destinations
         """
-        # Calculate preference similarity
-        user_preferences = np.zeros(len(self.unique_preferences))
-        for i, pref in enumerate(self.unique_preferences):
-            if pref in preferences:
-                user_preferences[i] = 1
-                
-        destination_preferences = self.df[[f'pref_{pref}' for pref in self.unique_preferences]].values
-        similarities = []
+        trace = start_trace(self.metrics_sink, 'hybrid')
         
-        for dest_prefs in destination_preferences:
-            if np.sum(dest_prefs) > 0 and np.sum(user_preferences) > 0:
-                sim = np.dot(dest_prefs, user_preferences) / (np.linalg.norm(dest_prefs) * np.linalg.norm(user_preferences))
-            else:
-                sim = 0
-            similarities.append(sim)
-            
-        self.df['Preference_Similarity'] = similarities
-        
-        # Calculate demographic score
-        if group_type == 'Family':
-            self.df['Demo_Score'] = self.df['Family_Friendly']
-        elif group_type == 'Solo':
-            self.df['Demo_Score'] = self.df['Solo_Travel']
-        elif group_type == 'Couple':
-            self.df['Demo_Score'] = self.df['Couple_Friendly']
-        elif group_type == 'Senior':
-            self.df['Demo_Score'] = self.df['Senior_Friendly']
+        # Adjust budget per total travelers
+        per_person_min = min_budget * (num_adults + (num_children * 0.5))  # Children counted as 0.5 for budget
+        per_person_max = max_budget * (num_adults + (num_children * 0.5))
+        query = (preferences, group_type, num_adults, num_children, min_budget, max_budget, current_month)
+        
+        if self.topk_mode == 'threshold':
+            candidates, scores = self._threshold_candidates(query, per_person_min, per_person_max, top_n, trace)
         else:
-            self.df['Demo_Score'] = (self.df['Family_Friendly'] + self.df['Solo_Travel'] + 
-                                  self.df['Couple_Friendly'] + self.df['Senior_Friendly']) / 4
+            # Only destinations whose budget overlaps the adjusted budget can be
+            # recommended, so score just those
+            candidates = self.budget_index.overlapping(per_person_min, per_person_max)
+            trace.mark('budget_mask', len(candidates))
+            scores = self._hybrid_scores(candidates, *query, trace)
         
-        # Adjust for group size
-        total_people = num_adults + num_children
-        if total_people > 4:
-            self.df['Demo_Score'] = self.df['Demo_Score'] * (self.df['Family_Friendly'] / 3)
+        # Return the top_n recommendations by final score
+        top = top_rows(scores['Final_Score'], top_n)
+        trace.mark('ranking', len(candidates))
+        scores = self._result_scores(candidates[top], {column: values[top] for column, values in scores.items()},
+                                     group_type, num_adults, num_children, current_month)
+        result = self._build_result(candidates[top], **scores)
+        trace.mark('build_result', len(top))
+        trace.finish()
+        return result
+    
+    @on_snapshot
+    def hybrid_query_key(self, preferences, group_type='Family', num_adults=1, num_children=0,
+                         min_budget=0, max_budget=float('inf'), current_month=None, top_n=5):
+        """
+        Canonical form of a hybrid query
         
-        # Calculate budget fit
-        budget_filter = (self.df['Budget_Min'] >= min_budget) & (self.df['Budget_Max'] <= max_budget)
-        if budget_filter.sum() == 0:
-            self.df['Budget_Fit'] = 1 / (1 + abs(self.df['Budget_Min'] - min_budget) + abs(self.df['Budget_Max'] - max_budget))
-        else:
-            self.df['Budget_Fit'] = budget_filter.astype(float)
-        
-        # Consider seasonality if month is provided
-        if current_month:
-            months_map = {
-                'January': ['December-February', 'October-March', 'September-March', 'November-March', 'November-April'],
-                'February': ['December-February', 'October-March', 'September-March', 'November-March', 'November-April'],
-                'March': ['October-March', 'March-June', 'September-March', 'November-March', 'September-May', 'September-June', 'November-April'],
-                'April': ['March-June', 'April-June', 'September-May', 'November-April', 'September-June'],
-                'May': ['March-June', 'April-June', 'September-May', 'September-June'],
-                'June': ['March-June', 'April-June', 'September-June', 'October-June'],
-                'July': [],  # Monsoon in most parts
-                'August': [],  # Monsoon in most parts
-                'September': ['September-March', 'September-May', 'September-June', 'October-June'],
-                'October': ['October-March', 'September-March', 'October-June', 'October-May'],
-                'November': ['October-March', 'September-March', 'November-March', 'November-April', 'October-June', 'October-May'],
-                'December': ['December-February', 'October-March', 'September-March', 'November-March', 'November-April']
-            }
-            
-            if current_month in months_map:
-                self.df['Season_Match'] = self.df['Best_Time_to_Visit'].apply(lambda x: 1.0 if x in months_map[current_month] else 0.3)
-            else:
-                self.df['Season_Match'] = 1.0
+        Two queries with the same key get the same get_hybrid_recommendations
+        result from this catalog. Preferences become a set of known keywords,
+        group types scored alike share one value, the group size is reduced to
+        the flags the scoring uses, and a budget is reduced to its position among
+        the sorted budget endpoints whenever some destination fits inside it
+        (otherwise budget closeness needs the exact values).
+        
+        Args:
+            Same as get_hybrid_recommendations
+            
+        Returns:
+            Hashable key
+        """
+        index = self.budget_index
+        budget_factor = num_adults + (num_children * 0.5)
+        candidate_band = (int(np.searchsorted(index.sorted_max, min_budget * budget_factor, side='left')),
+                          int(np.searchsorted(index.sorted_min, max_budget * budget_factor, side='right')))
+        if index.any_contained(min_budget, max_budget):
+            budget_key = ('band', int(np.searchsorted(index.sorted_min, min_budget, side='left')),
+                          int(np.searchsorted(index.sorted_max, max_budget, side='right')))
         else:
-            self.df['Season_Match'] = 1.0
-            
-        # Calculate final score (weighted average)
-        self.df['Final_Score'] = (
-            0.35 * self.df['Preference_Similarity'] + 
-            0.25 * (self.df['Demo_Score'] / 5) +  # Normalize to 0-1
-            0.20 * self.df['Normalized_Popularity'] +
-            0.10 * self.df['Budget_Fit'] +
-            0.10 * self.df['Season_Match']
+            budget_key = ('exact', float(min_budget), float(max_budget))
+        group = group_query(group_type, num_adults, num_children)
+        return (
+            frozenset(self._preference_positions(preferences)),
+            group_type if group_type in DEMOGRAPHIC_COLUMNS else None,
+            num_adults + num_children > 4,
+            tuple(bool(rule.applies(group)) for rule in self.group_rules),
+            candidate_band,
+            budget_key,
+            month_mask(current_month),
+            int(top_n)
         )
+    
+    def _threshold_candidates(self, query, per_person_min, per_person_max, top_n, trace=NULL_TRACE):
+        """
+        Destinations sure to contain the hybrid top_n, found with Fagin's threshold algorithm
         
-        # Add group size adjustment
-        total_travelers = num_adults + num_children
-        
-        # Adjust scores based on group size
-        # if total_travelers > 6:
-        #     # Penalize destinations not suitable for large groups
-        #     self.df['Final_Score'] = self.df.apply(
-        #         lambda x: x['Final_Score'] * 0.7 if x['Type'] in ['Wildlife', 'Adventure'] else x['Final_Score'],
-        #         axis=1
-        #     )
-        
-        if num_children > 3:
-            # Boost family-friendly destinations
-            self.df['Final_Score'] = self.df.apply(
-                lambda x: x['Final_Score'] * 1.3 if x['Type'] in ['Beach', 'Theme Park', 'Wildlife'] else x['Final_Score'],
-                axis=1
-            )
-            # Penalize adventure destinations with young children
-            self.df['Final_Score'] = self.df.apply(
-                lambda x: x['Final_Score'] * 0.6 if x['Type'] in ['Adventure', 'Trekking' , 'Mountains'] and num_children < 12 else x['Final_Score'],
-                axis=1
-            )
+        Three lists are read in descending order a block at a time: destinations
+        sharing a keyword with the query by preference similarity (every other
+        destination has similarity 0), and all destinations by normalized
+        popularity and by demographic score. Each destination met is scored in
+        full. A destination not met yet scores at most the weighted sum of the
+        last value read from each list, full budget fit and season match, times
+        every boosting rule that applies; the walk stops once top_n scored
+        destinations beat that threshold strictly. The bound is evaluated with
+        the scoring's own operations, whose rounding is monotone, so the
+        top_n (ties broken by position) is exactly the one a full scan finds.
         
-        # Adjust budget per total travelers
-        per_person_min = min_budget * (num_adults + (num_children * 0.5))  # Children counted as 0.5 for budget
-        per_person_max = max_budget * (num_adults + (num_children * 0.5))
+        Args:
+            query: Tuple of the _hybrid_scores query arguments
+            per_person_min: Group-adjusted minimum budget
+            per_person_max: Group-adjusted maximum budget
+            top_n: Number of recommendations
+            trace: Query trace marking each stage (see query_metrics)
+            
+        Returns:
+            Tuple (candidates, scores) as for _hybrid_scores, with the candidates
+            in ascending position
+        """
+        preferences, group_type, num_adults, num_children = query[:4]
+        num_rows = len(self.df)
+        pref_rows, similarity = self._preference_candidates(preferences)
+        # Any order of equal similarities bounds the same, so skip the stable sort
+        by_similarity = np.argsort(-similarity)
+        pref_rows, similarity = pref_rows[by_similarity], similarity[by_similarity]
+        popularity_order, popularity = self._score_order('popularity')
+        demo_order, demo_score = self._score_order('demographic', group_type if group_type in DEMOGRAPHIC_COLUMNS else None,
+                                                   num_adults + num_children > 4)
+        group = group_query(group_type, num_adults, num_children)
+        boosts = [rule.multiplier for rule in self.group_rules if rule.multiplier > 1 and np.all(rule.applies(group))]
+        budget_min, budget_max = self.column_arrays['Budget_Min'], self.column_arrays['Budget_Max']
+        trace.mark('sorted_lists', len(pref_rows))
         
-        # Filter based on adjusted budget
-        recommendations = self.df[
-            (self.df['Budget_Min'] <= per_person_max) & 
-            (self.df['Budget_Max'] >= per_person_min)
-        ]
+        seen = np.zeros(num_rows, dtype=bool)
+        candidates, scores = [], []
+        depth = 0
+        block_size = max(4 * top_n, 1024)
+        while depth < num_rows:
+            block = np.concatenate([pref_rows[depth:depth + block_size], popularity_order[depth:depth + block_size],
+                                    demo_order[depth:depth + block_size]])
+            depth = min(depth + block_size, num_rows)
+            block = np.unique(block)
+            block = block[~seen[block]]
+            seen[block] = True
+            block = block[(budget_min[block] <= per_person_max) & (budget_max[block] >= per_person_min)]
+            if len(block):
+                candidates.append(block)
+                scores.append(self._hybrid_scores(block, *query))
+            
+            # Best score any destination not met yet could reach
+            partial_bound = (0.25 * (demo_score[depth - 1] / 5) +
+                             0.20 * popularity[depth - 1] +
+                             0.10 * 1.0)
+            threshold = (partial_bound +
+                         0.35 * (similarity[depth - 1] if depth <= len(similarity) else 0.0) +
+                         0.10 * 1.0)
+            for boost in boosts:
+                threshold = threshold * boost
+            found = sum(len(rows) for rows in candidates)
+            if top_n <= 0 or (found >= top_n and
+                              np.partition(np.concatenate([s['Final_Score'] for s in scores]), found - top_n)[found - top_n]
+                              > threshold):
+                break
+            block_size *= 2
         
-        # Sort by final score and return top_n recommendations
-        recommendations = recommendations.sort_values('Final_Score', ascending=False).head(top_n)
+        seen_count = int(seen.sum())
+        if not candidates:
+            candidates, scores = [np.empty(0, dtype=np.intp)], [self._hybrid_scores(np.empty(0, dtype=np.intp), *query)]
+        candidates = np.concatenate(candidates)
+        order = np.argsort(candidates, kind='stable')
+        scores = {column: np.concatenate([s[column] for s in scores])[order] for column in scores[0]}
+        trace.mark('threshold_walk', seen_count)
+        return candidates[order], scores
+    
+    def _score_order(self, component, *key):
+        """
+        Destinations by descending query-independent score component, sorted once per catalog version
+        
+        Args:
+            component: 'popularity', or 'demographic' with the group type (None for
+                the default scoring) and the large group flag as key
+                
+        Returns:
+            Tuple (order, values) with the destination positions and their
+            component values in that order
+        """
+        cached = self._score_orders.get((component, *key))
+        if cached is None:
+            if component == 'popularity':
+                values = self.popularity
+            else:
+                group_type, large_group = key
+                values = self._demographic_score(group_type, large_group)
+            order = np.argsort(-np.asarray(values, dtype=float), kind='stable').astype(code_dtype(len(values)))
+            cached = (order, np.asarray(values)[order])
+            for array in cached:
+                array.flags.writeable = False
+            self._score_orders[(component, *key)] = cached
+        return cached
+    
+    def _hybrid_scores(self, candidates, preferences, group_type, num_adults, num_children,
+                       min_budget, max_budget, current_month, trace=NULL_TRACE, span=None):
+        """
+        Query-dependent and final hybrid scores of the candidate destinations
+        
+        Args:
+            candidates: Positions of the destinations to score
+            trace: Query trace marking each stage (see query_metrics)
+            span: Range (start, stop) of positions holding every candidate, so
+                only that range of the partial score is computed (see _partial_score)
+            Other arguments as for get_hybrid_recommendations
+            
+        Returns:
+            Dict of score column name to an array aligned with candidates
+        """
+        # Calculate preference similarity
+        similarity = self._preference_similarity(preferences, candidates)
+        trace.mark('preference_similarity', len(candidates))
+        
+        # Demographic (adjusted for group size), popularity and season terms,
+        # memoized per group and trip window
+        partial_score = self._partial_score(group_type, num_adults + num_children > 4, month_mask(current_month),
+                                            candidates, span)
+        trace.mark('partial_score', len(candidates))
+        
+        # Calculate budget fit
+        budget_fit = self._budget_fit(min_budget, max_budget, candidates)
+        trace.mark('budget_fit', len(candidates))
+            
+        # Calculate final score (weighted average) with the group size adjustments
+        final_score = self._weighted_score(similarity, partial_score, budget_fit)
+        trace.mark('weighting', len(candidates))
+        final_score = self._apply_group_rules(final_score, group_query(group_type, num_adults, num_children),
+                                              candidates)
+        trace.mark('group_rules', len(candidates))
+        return {'Preference_Similarity': similarity, 'Budget_Fit': budget_fit, 'Final_Score': final_score}
+    
+    def _result_scores(self, rows, scores, group_type, num_adults, num_children, current_month):
+        """
+        Score columns of hybrid results
+        
+        The demographic score and season match only enter the hybrid score
+        through the partial score, so they are computed for the returned rows alone.
         
-        return recommendations
+        Args:
+            rows: Positions of the returned destinations
+            scores: Dict of _hybrid_scores columns aligned with rows
+            Other arguments as for get_hybrid_recommendations
+            
+        Returns:
+            Dict of every hybrid score column, in result order
+        """
+        return {
+            'Preference_Similarity': scores['Preference_Similarity'],
+            'Demo_Score': self._demographic_score(group_type, num_adults + num_children > 4, rows),
+            'Budget_Fit': scores['Budget_Fit'],
+            'Season_Match': self._season_match(month_mask(current_month), rows),
+            'Final_Score': scores['Final_Score']
+        }
+    
+    @on_snapshot
+    def get_hybrid_recommendations_batch(self, profiles, chunk_size=None):
+        """
+        Hybrid recommendations for many user profiles at once
+        
+        Profiles are scored in chunks with matrix-matrix operations, using the same
+        arithmetic as get_hybrid_recommendations, so every profile gets exactly the
+        destinations and scores a per-profile call would return.
+        
+        Args:
+            profiles: DataFrame (or list of dicts) with one row per user profile and columns
+                named like the get_hybrid_recommendations arguments: preferences, group_type,
+                num_adults, num_children, min_budget, max_budget, current_month and top_n.
+                Missing columns take the same defaults. The index is used as the profile id.
+            chunk_size: Number of profiles scored together (sized to the catalog when None)
+            
+        Returns:
+            DataFrame with columns profile_id, rank (starting at 1), destination_index
+            (row position in self.df) and score, one row per recommendation
+        """
+        profiles = pd.DataFrame(profiles)
+        if chunk_size is None:
+            chunk_size = max(1, BATCH_CHUNK_CELLS // max(len(self.df), 1))
+        
+        columns = {}
+        for name, default in BATCH_PROFILE_DEFAULTS.items():
+            columns[name] = profiles[name].to_numpy() if name in profiles else np.full(len(profiles), default)
+        trip_masks = [month_mask(month) for month in columns['current_month']]
+        
+        results = []
+        for start in range(0, len(profiles), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            num_adults = columns['num_adults'][chunk].astype(int)[:, None]
+            num_children = columns['num_children'][chunk].astype(int)[:, None]
+            min_budget = columns['min_budget'][chunk].astype(float)[:, None]
+            max_budget = columns['max_budget'][chunk].astype(float)[:, None]
+            top_n = columns['top_n'][chunk].astype(int)
+            
+            # Preference similarity of each profile from the packed preference bits
+            similarity = np.array([self._preference_similarity(preferences)
+                                   for preferences in profiles['preferences'].iloc[chunk]])
+            
+            # Partial scores only take a handful of distinct vectors per chunk, so
+            # look each distinct one up once and gather it per profile
+            partial_keys = list(zip(columns['group_type'][chunk], (num_adults + num_children)[:, 0] > 4,
+                                    trip_masks[chunk]))
+            partial_score = self._gather_distinct(partial_keys, lambda key: self._partial_score(*key))
+            
+            budget_fit = self._budget_fit(min_budget, max_budget)
+            group = group_query(columns['group_type'][chunk][:, None], num_adults, num_children)
+            final_score = self._final_score(similarity, partial_score, budget_fit, group)
+            
+            # Destinations outside the group's adjusted budget can never be recommended
+            budget_factor = num_adults + (num_children * 0.5)
+            budget_min, budget_max = self.column_arrays['Budget_Min'], self.column_arrays['Budget_Max']
+            overlap_mask = (budget_min <= max_budget * budget_factor) & (budget_max >= min_budget * budget_factor)
+            final_score = np.where(overlap_mask, final_score, -np.inf)
+            
+            ranked = top_rows_2d(final_score, top_n.max(initial=0))
+            scores = np.take_along_axis(final_score, ranked, axis=1)
+            keep = (np.arange(ranked.shape[1]) < top_n[:, None]) & np.isfinite(scores)
+            profile_rows, ranks = np.nonzero(keep)
+            results.append(pd.DataFrame({
+                'profile_id': profiles.index[start + profile_rows],
+                'rank': ranks + 1,
+                'destination_index': ranked[keep],
+                'score': scores[keep]
+            }))
+            
+        if not results:
+            return pd.DataFrame(columns=['profile_id', 'rank', 'destination_index', 'score'])
+        return pd.concat(results, ignore_index=True)
+    
+    @staticmethod
+    def _gather_distinct(keys, compute):
+        """Stack compute(key) for every key, evaluating each distinct key only once"""
+        distinct = {}
+        codes = [distinct.setdefault(key, len(distinct)) for key in keys]
+        vectors = np.stack([compute(key) for key in distinct])
+        return vectors[codes]
+    
+    @on_snapshot
+    def facet_search(self, selection=None):
+        """
+        Destinations matching a facet selection, and the count of every facet value
+        
+        Values chosen within a facet are alternatives (OR) and facets all have
+        to match (AND). The count of a value is the number of destinations that
+        hold it and match the selection of every other facet, i.e. how many
+        destinations the selection would match with that value chosen instead.
+        
+        Args:
+            selection: Dict of facet name (one of FACETS) to the values chosen in it
+            
+        Returns:
+            Tuple (positions, counts) with the catalog positions of the matching
+            destinations in ascending order and counts mapping every facet to a
+            dict of value to count
+        """
+        bitmap, counts = self.facet_index.select(selection)
+        positions = np.flatnonzero(np.unpackbits(bitmap.view(np.uint8), count=len(self.df), bitorder='little'))
+        return positions, counts
+    
+    @on_snapshot
+    def browse_destinations(self, sort_by='popularity', types=None, states=None, page_size=12, cursor=None,
+                            facets=None):
+        """
+        One page of the catalog, filtered and sorted, with a cursor to the next page
+        
+        Pages are cut from a presorted ordering (ties broken by position), so
+        successive pages never repeat or skip a destination, and a page only
+        reads as many destinations as it needs to fill up.
+        
+        Args:
+            sort_by: One of BROWSE_ORDERS ('popularity', 'name', 'budget_low', 'budget_high')
+            types: Destination types to keep (all when empty)
+            states: States to keep (all when empty)
+            page_size: Number of destinations per page
+            cursor: Token returned with the previous page (None for the first page)
+            facets: Facet selection to keep, as for facet_search (types and states
+                are added to its Type and State facets)
+            
+        Returns:
+            Tuple (page, next_cursor) with the page as a DataFrame and next_cursor
+            None on the last page
+        """
+        if sort_by not in BROWSE_ORDERS:
+            raise ValueError(f"Unknown sort order '{sort_by}', expected one of {', '.join(BROWSE_ORDERS)}")
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        selection = {name: set(values or []) for name, values in (facets or {}).items()}
+        selection['Type'] = selection.get('Type', set()) | set(types or [])
+        selection['State'] = selection.get('State', set()) | set(states or [])
+        selection = {name: sorted(map(str, values)) for name, values in selection.items() if values}
+        query = {'sort_by': sort_by, 'facets': selection}
+        position = 0 if cursor is None else self._read_cursor(cursor, query)
+        
+        order = self._browse_order(sort_by)
+        bitmap = self.facet_index.select(selection)[0] if selection else None
+        block_size = max(4 * page_size, 256)
+        matches = []
+        found = 0
+        # Read the ordering block by block until the page and one more match are found
+        while found <= page_size and position < len(order):
+            block = order[position:position + block_size]
+            keep = np.ones(len(block), dtype=bool) if bitmap is None else bitmap_contains(bitmap, block)
+            matches.append(position + np.flatnonzero(keep))
+            found += len(matches[-1])
+            position += len(block)
+            
+        matches = np.concatenate(matches) if matches else np.empty(0, dtype=np.intp)
+        next_cursor = self._make_cursor(query, matches[page_size]) if len(matches) > page_size else None
+        return self.df.iloc[order[matches[:page_size]]], next_cursor
+    
+    def iter_destination_pages(self, sort_by='popularity', types=None, states=None, page_size=12):
+        """
+        Generator over all pages of browse_destinations, from one catalog version
+        
+        Yields:
+            One DataFrame per page
+        """
+        snapshot = self.snapshot()
+        cursor = None
+        while True:
+            page, cursor = snapshot.browse_destinations(sort_by, types, states, page_size, cursor)
+            yield page
+            if cursor is None:
+                break
+    
+    def _browse_order(self, sort_by):
+        """Destination positions in browse order, sorted once per catalog version"""
+        order = self._browse_orders.get(sort_by)
+        if order is None:
+            column, ascending = BROWSE_ORDERS[sort_by]
+            values = self.df[column].to_numpy()
+            order = np.argsort(values if ascending else -values, kind='stable').astype(code_dtype(len(values)))
+            order.flags.writeable = False
+            self._browse_orders[sort_by] = order
+        return order
+    
+    def _facet_index(self):
+        """FacetIndex over FACETS of this catalog version"""
+        # The builders hold this version's arrays, not self, whose attributes the
+        # next version replaces
+        type_names, type_codes = self.type_names, self.type_codes
+        states = self.df['State']
+        months = self.season_masks
+        budget_min = self.column_arrays['Budget_Min']
+        ratings = [self.column_arrays[column] for column in DEMOGRAPHIC_COLUMNS.values()]
+        
+        def by_state():
+            codes, names = pd.factorize(states, sort=True)
+            return list(names), code_membership(codes, len(names))
+        
+        def by_budget():
+            codes = np.searchsorted([limit for _, limit in BUDGET_BANDS], budget_min, side='right')
+            return [band for band, _ in BUDGET_BANDS], code_membership(codes, len(BUDGET_BANDS))
+        
+        return FacetIndex(len(self.df), {
+            'Type': lambda: (type_names, code_membership(type_codes, len(type_names))),
+            'State': by_state,
+            'Season': lambda: (MONTHS, (months[None, :] >> np.arange(len(MONTHS))[:, None]) & 1 == 1),
+            'Budget': by_budget,
+            'Suited_For': lambda: (list(DEMOGRAPHIC_COLUMNS), np.stack(ratings) >= SUITABLE_RATING)
+        })
+    
+    def _make_cursor(self, query, position):
+        """Opaque token resuming query at position of its ordering"""
+        state = {'version': self.catalog_version, 'query': query, 'position': int(position)}
+        return base64.urlsafe_b64encode(json.dumps(state).encode('utf-8')).decode('ascii')
+    
+    def _read_cursor(self, cursor, query):
+        """Position a cursor resumes at, checking it belongs to query and this catalog version"""
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            version, cursor_query, position = state['version'], state['query'], int(state['position'])
+        except (ValueError, TypeError, KeyError, AttributeError):
+            raise ValueError("Invalid cursor")
+        if not 0 <= position <= len(self.df):
+            raise ValueError("Invalid cursor")
+        if cursor_query != query:
+            raise ValueError("The cursor belongs to a different sort order or filter")
+        if version != self.catalog_version:
+            raise ValueError("The catalog has changed since the cursor was issued")
+        return position
     
     def explain_recommendation(self, destination_name):
         """
@@ -279,26 +1980,55 @@ class IndianTravelRecommender:
         Returns:
             String explanation
         """
-        if destination_name not in self.df['Destination_Name'].values:
-            return f"Destination '{destination_name}' not found in the database."
-            
-        dest_data = self.df[self.df['Destination_Name'] == destination_name].iloc[0]
+        return self.explain_recommendations([destination_name])[destination_name]
+    
+    @on_snapshot
+    def explain_recommendations(self, destination_names, recommendations=None):
+        """
+        Explain several destinations in one pass over the catalog
+        
+        Args:
+            destination_names: Names of the destinations
+            recommendations: Optional result DataFrame of a get_* call; for destinations
+                listed in it, the explanation ends with that query's score breakdown
+                
+        Returns:
+            Dict of destination name to string explanation
+        """
+        destination_names = list(destination_names)
+        found = [name for name in destination_names if name in self.name_index]
+        rows = [self.name_index[name] for name in found]
+        details = self.df.iloc[rows, self.df.columns.get_indexer(EXPLANATION_COLUMNS)]
         
-        explanation = f"About {destination_name}:\n"
-        explanation += f"- Located in: {dest_data['State']}\n"
-        explanation += f"- Type: {dest_data['Type']}\n"
-        explanation += f"- Best time to visit: {dest_data['Best_Time_to_Visit']}\n"
-        explanation += f"- Popularity: {dest_data['Popularity_Score']}/10\n"
-        explanation += f"- Budget range: ₹{dest_data['Budget_Min']}-{dest_data['Budget_Max']} per day\n"
-        explanation += f"- Experience offerings: {dest_data['Preferences']}\n"
+        breakdowns = {}
+        if recommendations is not None:
+            score_columns = [column for column in SCORE_LABELS if column in recommendations.columns]
+            for values in recommendations[['Destination_Name'] + score_columns].itertuples(index=False):
+                breakdowns.setdefault(values[0], dict(zip(score_columns, values[1:])))
         
-        explanation += "\nDemographic suitability (rated 1-5):\n"
-        explanation += f"- Family-friendly: {dest_data['Family_Friendly']}/5\n"
-        explanation += f"- Solo travel: {dest_data['Solo_Travel']}/5\n"
-        explanation += f"- Couple-friendly: {dest_data['Couple_Friendly']}/5\n"
-        explanation += f"- Senior-friendly: {dest_data['Senior_Friendly']}/5\n"
+        explanations = {name: f"Destination '{name}' not found in the database." for name in destination_names}
+        for name, dest_data in zip(found, details.to_dict('records')):
+            explanation = f"About {name}:\n"
+            explanation += f"- Located in: {dest_data['State']}\n"
+            explanation += f"- Type: {dest_data['Type']}\n"
+            explanation += f"- Best time to visit: {dest_data['Best_Time_to_Visit']}\n"
+            explanation += f"- Popularity: {dest_data['Popularity_Score']}/10\n"
+            explanation += f"- Budget range: ₹{dest_data['Budget_Min']}-{dest_data['Budget_Max']} per day\n"
+            explanation += f"- Experience offerings: {dest_data['Preferences']}\n"
+            
+            explanation += "\nDemographic suitability (rated 1-5):\n"
+            explanation += f"- Family-friendly: {dest_data['Family_Friendly']}/5\n"
+            explanation += f"- Solo travel: {dest_data['Solo_Travel']}/5\n"
+            explanation += f"- Couple-friendly: {dest_data['Couple_Friendly']}/5\n"
+            explanation += f"- Senior-friendly: {dest_data['Senior_Friendly']}/5\n"
+            
+            if breakdowns.get(name):
+                explanation += "\nScore breakdown for this search:\n"
+                for column, value in breakdowns[name].items():
+                    explanation += f"- {SCORE_LABELS[column]}: {value:.2f}\n"
+            explanations[name] = explanation
         
-        return explanation
+        return explanations
 
 
 # Example of how to use the recommender
@@ -306,6 +2036,8 @@ if __name__ == "__main__":
     # Initialize the recommender
     recommender = IndianTravelRecommender()
     
+    print(recommender.startup_report())
+    
     # Example 1: Get recommendations based on preferences
     print("\n=== Recommendations based on preferences ===")
     pref_recs = recommender.get_recommendation_by_preferences(['Beach', 'Relaxation'])
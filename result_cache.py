@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+
+class CachedRecommender:
+    """
+    Hybrid recommendation cache in front of an IndianTravelRecommender
+
+    Queries are keyed on their canonical form (see
+    IndianTravelRecommender.hybrid_query_key), so queries that differ only in
+    preference order, unknown keywords, group details the scoring ignores or a
+    budget inside the same band share one entry. Entries are evicted least
+    recently used first once max_entries is reached, and after ttl seconds when
+    a ttl is set. The cache empties itself when the recommender's catalog
+    version changes. Every other attribute is read from the wrapped recommender,
+    so the cache can stand in for it.
+    """
+    def __init__(self, recommender, max_entries=1024, ttl=None):
+        """
+        Args:
+            recommender: Recommender to cache the hybrid results of
+            max_entries: Largest number of cached results
+            ttl: Seconds a result stays valid (forever when None)
+        """
+        self.recommender = recommender
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = recommender.catalog_version
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def __getattr__(self, name):
+        if name == 'recommender':
+            raise AttributeError(name)
+        return getattr(self.recommender, name)
+
+    def get_hybrid_recommendations(self, preferences, group_type='Family', num_adults=1,
+                                   num_children=0, min_budget=0, max_budget=float('inf'),
+                                   current_month=None, top_n=5):
+        """
+        Cached IndianTravelRecommender.get_hybrid_recommendations
+
+        Returns:
+            DataFrame of recommended destinations (a copy the caller may modify)
+        """
+        query = {'preferences': preferences, 'group_type': group_type, 'num_adults': num_adults,
+                 'num_children': num_children, 'min_budget': min_budget, 'max_budget': max_budget,
+                 'current_month': current_month, 'top_n': top_n}
+        # Key, version and result all come from one catalog version
+        recommender = self.recommender.snapshot()
+        version = recommender.catalog_version
+        key = recommender.hybrid_query_key(**query)
+        now = time.monotonic()
+
+        with self._lock:
+            if version != self._version:
+                self._stats['invalidations'] += 1
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, result = entry
+                if expires is None or now < expires:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return result.copy()
+                del self._entries[key]
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+
+        # Score outside the lock, so concurrent misses do not wait for each other
+        result = recommender.get_hybrid_recommendations(**query)
+
+        with self._lock:
+            if version == self._version and self.max_entries > 0:
+                self._entries[key] = (None if self.ttl is None else now + self.ttl, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        return result.copy()
+
+    def stats(self):
+        """
+        Cache statistics
+
+        Returns:
+            Dict with the hit, miss, eviction, expiration and invalidation counts,
+            the hit rate and the current number of entries
+        """
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
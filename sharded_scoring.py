@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from catalog_artifact import compile_catalog
+from recommendation_system import IndianTravelRecommender, PARTIAL_SCORE_CACHE_BYTES, top_rows
+
+# Recommender of a worker process, loaded once when the worker starts
+_worker_recommender = None
+
+def _init_worker(artifact, group_rules, partial_cache_bytes):
+    """Load the compiled catalog in a pool worker; its arrays are memory-mapped, not copied"""
+    global _worker_recommender
+    _worker_recommender = IndianTravelRecommender(artifact, group_rules=group_rules,
+                                                  partial_cache_bytes=partial_cache_bytes)
+
+def _worker_pid(_):
+    """Process id of the worker running this task"""
+    return os.getpid()
+
+def _score_shard(start, stop, per_person_min, per_person_max, query):
+    """
+    Score the destinations at positions start..stop-1 in a pool worker
+
+    Returns:
+        Tuple (rows, scores) with the shard's local top_n positions, in ranking
+        order, and a dict of score column name to the values at those rows
+    """
+    recommender = _worker_recommender
+    budget_min = recommender.column_arrays['Budget_Min'][start:stop]
+    budget_max = recommender.column_arrays['Budget_Max'][start:stop]
+    candidates = start + np.flatnonzero((budget_min <= per_person_max) & (budget_max >= per_person_min))
+    top_n = query.pop('top_n')
+    # Partial scores are computed and memoized for this shard's rows only
+    scores = recommender._hybrid_scores(candidates, **query, span=(start, stop))
+    top = top_rows(scores['Final_Score'], top_n)
+    return candidates[top], {column: values[top] for column, values in scores.items()}
+
+class ShardedRecommender:
+    """
+    Hybrid recommendations scored in parallel over shards of the catalog
+
+    The catalog is compiled once (see catalog_artifact) and every worker of a
+    long-lived process pool memory-maps the same artifact, so the shards are
+    shared through the page cache instead of being pickled for each query. A
+    query sends each shard's row range to the pool, every shard returns its
+    local top_n, and the merge picks the global top_n with the same tie-breaking
+    as get_hybrid_recommendations, so both return the same destinations.
+    """
+    def __init__(self, data_path='expanded_indian_destinations.csv', num_shards=None, cache_dir=None,
+                 group_rules=None, partial_cache_bytes=PARTIAL_SCORE_CACHE_BYTES):
+        """
+        Start the worker pool
+
+        Args:
+            data_path: Catalog file (compiled if needed), or a compiled artifact directory
+            num_shards: Number of shards and worker processes (one per CPU when None)
+            cache_dir: Directory holding compiled artifacts (next to data_path when None)
+            group_rules: AdjustmentRules applied to hybrid scores (GROUP_RULES when None)
+            partial_cache_bytes: Memory bound of the memoized partial score vectors
+                across all workers, split evenly between them
+        """
+        self.artifact = data_path if os.path.isdir(data_path) else compile_catalog(data_path, cache_dir)
+        self.recommender = IndianTravelRecommender(self.artifact, group_rules=group_rules)
+        self.num_shards = num_shards or os.cpu_count() or 1
+        bounds = np.linspace(0, len(self.recommender.df), self.num_shards + 1).astype(int)
+        self.shards = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        self.pool = ProcessPoolExecutor(max_workers=self.num_shards, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker,
+                                        initargs=(self.artifact, self.recommender.group_rules,
+                                                  partial_cache_bytes // self.num_shards))
+        # Start every worker now instead of on the first query
+        list(self.pool.map(_worker_pid, range(self.num_shards)))
+
+    def get_hybrid_recommendations(self, preferences, group_type='Family', num_adults=1,
+                                   num_children=0, min_budget=0, max_budget=float('inf'),
+                                   current_month=None, top_n=5):
+        """
+        Hybrid recommendations scored across the shards
+
+        Takes the same arguments and returns the same DataFrame as
+        IndianTravelRecommender.get_hybrid_recommendations.
+        """
+        budget_factor = num_adults + (num_children * 0.5)
+        query = {'preferences': preferences, 'group_type': group_type, 'num_adults': num_adults,
+                 'num_children': num_children, 'min_budget': min_budget, 'max_budget': max_budget,
+                 'current_month': current_month, 'top_n': top_n}
+        futures = [self.pool.submit(_score_shard, start, stop, min_budget * budget_factor,
+                                    max_budget * budget_factor, dict(query))
+                   for start, stop in self.shards]
+        shard_results = [future.result() for future in futures]
+
+        # Shards hold increasing positions and each local top lists equal scores
+        # by position, so ties in the merged arrays are still broken by position
+        rows = np.concatenate([shard_rows for shard_rows, _ in shard_results])
+        scores = {column: np.concatenate([shard_scores[column] for _, shard_scores in shard_results])
+                  for column in shard_results[0][1]}
+        top = top_rows(scores['Final_Score'], top_n)
+        scores = self.recommender._result_scores(rows[top], {column: values[top] for column, values in scores.items()},
+                                                 group_type, num_adults, num_children, current_month)
+        return self.recommender._build_result(rows[top], **scores)
+
+    def close(self):
+        """Shut the worker pool down"""
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,95 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from catalog_io import CATALOG_COLUMNS, MONTHS
+
+# The real catalog shipped next to this module
+REFERENCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'expanded_indian_destinations.csv')
+
+RATING_COLUMNS = ['Family_Friendly', 'Solo_Travel', 'Couple_Friendly', 'Senior_Friendly',
+                  'Budget_Traveler', 'Luxury_Traveler']
+
+def _frequencies(values):
+    """Distinct values and their relative frequencies"""
+    counts = pd.Series(values).value_counts()
+    return counts.index.to_numpy(dtype=object), (counts / counts.sum()).to_numpy()
+
+def generate_catalog(num_destinations, seed=0, reference_path=REFERENCE_PATH,
+                     min_preferences=3, max_preferences=6):
+    """
+    Generate a synthetic destination catalog with the real catalog's schema
+
+    States, types, Best_Time_to_Visit ranges and preference keywords are drawn
+    with the frequencies they have in the reference catalog; a quarter of the
+    season ranges are random month ranges (including ones that wrap around the
+    year end) so the generated catalog is not limited to the reference values.
+    Everything is generated with vectorized numpy calls, so millions of rows
+    take seconds.
+
+    Args:
+        num_destinations: Number of destinations to generate
+        seed: Random seed; the same seed always gives the same catalog
+        reference_path: Real catalog to take the vocabularies and frequencies from
+        min_preferences: Minimum number of keywords drawn per destination (repeated
+            draws are dropped, so a few destinations end up with fewer)
+        max_preferences: Maximum number of keywords per destination
+
+    Returns:
+        DataFrame with the catalog columns
+    """
+    rng = np.random.default_rng(seed)
+    reference = pd.read_csv(reference_path)
+    n = num_destinations
+
+    states, state_freq = _frequencies(reference['State'])
+    types, type_freq = _frequencies(reference['Type'])
+    seasons, season_freq = _frequencies(reference['Best_Time_to_Visit'])
+    keywords, keyword_freq = _frequencies(reference['Preferences'].str.split(', ').explode())
+
+    state = states[rng.choice(len(states), size=n, p=state_freq)]
+    destination_type = types[rng.choice(len(types), size=n, p=type_freq)]
+
+    season = seasons[rng.choice(len(seasons), size=n, p=season_freq)]
+    random_range = rng.random(n) < 0.25
+    month_names = np.array(MONTHS, dtype=object)
+    starts = month_names[rng.integers(0, 12, size=random_range.sum())]
+    ends = month_names[rng.integers(0, 12, size=random_range.sum())]
+    season[random_range] = starts + '-' + ends
+
+    # Draw max_preferences keywords per row, drop repeats within a row and keep
+    # a random number of the rest
+    picks = np.sort(rng.choice(len(keywords), size=(n, max_preferences), p=keyword_freq), axis=1)
+    keep = np.ones_like(picks, dtype=bool)
+    keep[:, 1:] = picks[:, 1:] != picks[:, :-1]
+    keep &= np.arange(max_preferences) < rng.integers(min_preferences, max_preferences + 1, size=(n, 1))
+    keep[:, 0] = True
+    picked = np.where(keep, keywords[picks], None)
+    preferences = [', '.join(filter(None, row)) for row in picked.tolist()]
+
+    catalog = {
+        'Destination_Name': [f"{name} {i}" for i, name in enumerate(state.tolist())],
+        'State': state,
+        'Type': destination_type,
+        'Best_Time_to_Visit': season,
+        'Preferences': preferences
+    }
+    for column in RATING_COLUMNS:
+        catalog[column] = rng.integers(1, 6, size=n)
+    catalog['Popularity_Score'] = rng.integers(1, 11, size=n)
+    budget_min = rng.integers(5, 31, size=n) * 100
+    catalog['Budget_Min'] = budget_min
+    catalog['Budget_Max'] = np.maximum(budget_min * rng.integers(3, 13, size=n) // 1000 * 1000, budget_min + 1000)
+    return pd.DataFrame(catalog, columns=CATALOG_COLUMNS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic destination catalog")
+    parser.add_argument('num_destinations', type=int, help="number of destinations to generate")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument('--output', help="output CSV path (default: synthetic_<n>.csv)")
+    args = parser.parse_args()
+
+    output = args.output or f"synthetic_{args.num_destinations}.csv"
+    generate_catalog(args.num_destinations, seed=args.seed).to_csv(output, index=False)
+    print(f"Synthetic catalog with {args.num_destinations} destinations written to {output}")
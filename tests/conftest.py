@@ -0,0 +1,14 @@
+import os
+import shutil
+import sys
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    """Copy of the expanded catalog, so compiled artifacts land in a temporary directory"""
+    path = tmp_path / 'expanded_indian_destinations.csv'
+    shutil.copy(os.path.join(REPO_ROOT, 'expanded_indian_destinations.csv'), path)
+    return str(path)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+from catalog_artifact import compile_catalog
+from recommendation_system import IndianTravelRecommender
+
+def test_update_destinations_mixed_keys(catalog_path):
+    recommender = IndianTravelRecommender(catalog_path, use_compiled=False)
+    before = recommender.df.set_index('Destination_Name')
+    recommender.update_destinations([
+        {'Destination_Name': 'Goa', 'Popularity_Score': 3},
+        {'Destination_Name': 'Manali', 'Type': 'Island'},
+        {'Destination_Name': 'Goa', 'Budget_Min': 123}
+    ])
+    after = recommender.df.set_index('Destination_Name')
+
+    # Each record only changes the fields it sets, and both edits to Goa apply
+    assert after.loc['Goa', 'Type'] == before.loc['Goa', 'Type']
+    assert after.loc['Goa', 'Popularity_Score'] == 3
+    assert after.loc['Goa', 'Budget_Min'] == 123
+    assert after.loc['Manali', 'Popularity_Score'] == before.loc['Manali', 'Popularity_Score']
+    assert after.loc['Manali', 'Type'] == 'Island'
+    assert after.dtypes['Popularity_Score'] == before.dtypes['Popularity_Score']
+
+    result = recommender.get_hybrid_recommendations(['Adventure', 'Mountains'], top_n=len(recommender.df))
+    assert not result['Final_Score'].isna().any()
+    assert not recommender.df['Type'].isna().any()
+    _, counts = recommender.facet_search({})
+    assert all(pd.notna(value) for value in counts['Type'])
+
+def test_compiled_catalog_shares_memory_mapped_columns(catalog_path):
+    recommender = IndianTravelRecommender(compile_catalog(catalog_path))
+    for column in ('Family_Friendly', 'Budget_Min', 'Normalized_Popularity'):
+        assert isinstance(recommender.column_arrays[column], np.memmap)
+        assert np.shares_memory(recommender.df[column].to_numpy(), recommender.column_arrays[column])
+
+def test_memory_usage_counts_every_catalog_column(catalog_path):
+    recommender = IndianTravelRecommender(catalog_path, use_compiled=False)
+    expected = recommender.df.memory_usage(deep=True, index=False).sum()
+    for df in (recommender.df, recommender.df.copy()):
+        # The copy puts same-dtype columns in one pandas block
+        recommender.df = df
+        usage = recommender.memory_usage()
+        assert sum(size for name, size in usage.items() if name.startswith('df.')) == expected